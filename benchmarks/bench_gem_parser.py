@@ -0,0 +1,166 @@
+"""
+Gem parser benchmark: the compiled tag stripper, gem-name matcher and
+description cache in src.utils.parsing against the previous
+BeautifulSoup-based implementation.
+
+Both parsers run over the same listings and must produce identical
+(ID, ethereal gem, prismatic gem) records before throughput is compared.
+Listings are read from the ``raw_listings`` table of a recorded database
+when ``--db`` is given, otherwise synthesized from the gem constants.
+
+    python benchmarks/bench_gem_parser.py [--db data/market.db] [--listings 20000] [--repeat 3]
+"""
+import argparse
+import logging
+import os
+import pickle
+import random
+import re
+import sqlite3
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup
+from src.config.constants import ALLOWED_GEMS_PRISMATIC, ALLOWED_GEMS_ETHEREAL, COURIERS, ITEMS
+from src.utils import parsing
+
+def reference_gem_text_both_gems(gem_text):
+    """parse_gem_text_both_gems as it was before the compiled parser, minus its debug prints."""
+    ethereal_gem = None
+    prismatic_gem = None
+    prismatic_match = re.search(r'(.*?)Prismatic Gem', gem_text)
+    ethereal_match = re.search(r'(.*?)Ethereal Gem', gem_text)
+    if prismatic_match and (not ethereal_match or prismatic_match.start() < ethereal_match.start()):
+        prismatic_name = prismatic_match.group(1).strip()
+        if prismatic_name in ALLOWED_GEMS_PRISMATIC:
+            prismatic_gem = prismatic_name
+        gem_text = gem_text[prismatic_match.end():].strip()
+    elif ethereal_match:
+        ethereal_name = ethereal_match.group(1).strip()
+        if ethereal_name in ALLOWED_GEMS_ETHEREAL:
+            ethereal_gem = ethereal_name
+        gem_text = gem_text[ethereal_match.end():].strip()
+    prismatic_match = re.search(r'(.*?)Prismatic Gem', gem_text)
+    if prismatic_match:
+        prismatic_name = prismatic_match.group(1).strip()
+        if prismatic_name in ALLOWED_GEMS_PRISMATIC:
+            prismatic_gem = prismatic_name
+    ethereal_match = re.search(r'(.*?)Ethereal Gem', gem_text)
+    if ethereal_match:
+        ethereal_name = ethereal_match.group(1).strip()
+        if ethereal_name in ALLOWED_GEMS_ETHEREAL:
+            ethereal_gem = ethereal_name
+    return ethereal_gem, prismatic_gem
+
+def reference_parse(listings):
+    """Gem extraction of parse_market_listings before the compiled parser."""
+    records = []
+    for listing in listings:
+        item_description = listing.item.description.market_name
+        ethereal_gem = prismatic_gem = None
+        if item_description in COURIERS:
+            for desc in listing.item.description.descriptions:
+                if "Gem" in desc.value:
+                    gem_text = BeautifulSoup(desc.value, 'html.parser').get_text(strip=True).replace("Empty Socket", "").strip()
+                    ethereal_gem, prismatic_gem = reference_gem_text_both_gems(gem_text)
+        else:
+            for desc in listing.item.description.descriptions:
+                if "Gem" in desc.value:
+                    gem_text = BeautifulSoup(desc.value, 'html.parser').get_text(strip=True).replace("Empty Socket", "").strip()
+                    if not (("Swine of the Sunken Galley" in item_description and "Explosive Burst" in gem_text) or
+                            ("Fractal Horns of Inner Abysm" in item_description and "Reflection's Shade" in gem_text)):
+                        prismatic_gem = next((allowed for allowed in ALLOWED_GEMS_PRISMATIC if allowed in gem_text), None)
+                    break
+        if ethereal_gem or prismatic_gem:
+            records.append((listing.id, ethereal_gem, prismatic_gem))
+    return records
+
+def current_parse(listings):
+    # Every run starts cold, so the cache only helps with repeats inside the listings
+    parsing.resolve_gems.cache_clear()
+    records, _ = parsing.parse_market_listings(listings)
+    return [(record.id, record.ethereal_gem, record.prismatic_gem) for record in records]
+
+def _span(text, color="rgb(255, 255, 255)"):
+    return f'<span style="font-size: 18px; color: {color}">{text.replace(chr(39), "&#39;")}</span>'
+
+def synthesize_listings(count, seed=7):
+    rng = random.Random(seed)
+    names = list(COURIERS) + list(ITEMS)
+    prismatic = list(ALLOWED_GEMS_PRISMATIC) + ["Unlisted Hue"]
+    ethereal = list(ALLOWED_GEMS_ETHEREAL) + ["Unlisted Glow"]
+    listings = []
+    for i in range(count):
+        name = rng.choice(names)
+        lines = [SimpleNamespace(value="Used By: Some Hero"), SimpleNamespace(value=" ")]
+        if name in COURIERS:
+            gems = [_span(f"{rng.choice(ethereal)} Ethereal Gem"), _span(rng.choice(prismatic), "rgb(0, 255, 0)") + " Prismatic Gem"]
+            if rng.random() < 0.2:
+                gems.reverse()
+            if rng.random() < 0.1:
+                gems = [_span("Empty Socket")] + gems
+            lines.append(SimpleNamespace(value="<br>".join(gems)))
+        elif rng.random() < 0.9:
+            lines.append(SimpleNamespace(value=_span(rng.choice(prismatic), "rgb(0, 255, 0)") + " Prismatic Gem"))
+        else:
+            lines.append(SimpleNamespace(value=_span("Empty Socket")))
+        description = SimpleNamespace(market_name=name, descriptions=lines)
+        listings.append(SimpleNamespace(
+            id=str(i), converted_price=rng.randint(1000, 100000), converted_fee=100,
+            item=SimpleNamespace(description=description)
+        ))
+    return listings
+
+def load_recorded_listings(db_path, limit):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT listing_data FROM raw_listings LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [pickle.loads(row[0]) for row in rows]
+
+def best_of(fn, listings, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(listings)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help="database with recorded raw_listings")
+    parser.add_argument('--listings', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if args.db:
+        listings = load_recorded_listings(args.db, args.listings)
+        source = f"recorded ({args.db})"
+    else:
+        listings = synthesize_listings(args.listings)
+        source = "synthetic"
+
+    reference_time, expected = best_of(reference_parse, listings, args.repeat)
+    current_time, actual = best_of(current_parse, listings, args.repeat)
+
+    mismatches = [(e, a) for e, a in zip(expected, actual) if e != a]
+    if len(expected) != len(actual) or mismatches:
+        print(f"PARITY FAILED: {len(expected)} reference vs {len(actual)} current records")
+        for e, a in mismatches[:10]:
+            print(f"  reference {e}  current {a}")
+        sys.exit(1)
+
+    print(f"{len(listings)} {source} listings, {len(expected)} with gems, outputs identical")
+    print(f"reference (BeautifulSoup) : {reference_time:.3f}s  {len(listings) / reference_time:,.0f} listings/s")
+    print(f"compiled parser           : {current_time:.3f}s  {len(listings) / current_time:,.0f} listings/s")
+    print(f"speedup                   : {reference_time / current_time:.1f}x")
+    info = parsing.resolve_gems.cache_info()
+    print(f"gem cache                 : {parsing.gem_cache_hit_rate():.1%} hits, {info.currsize}/{info.maxsize} entries")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Hot-path logging benchmark: log volume and CPU time of parsing pages of
+listings the way ItemService does, with the loggers at INFO (per-page
+summaries only) and at DEBUG (per-listing detail), against a baseline that
+reproduces the logging before it was level-gated: INFO records per listing,
+print() calls per courier listing and in parse_gem_text_both_gems, and a
+WorkerLogger that builds its prefix and extra dict for every call.
+
+Records go through a formatting StreamHandler and prints into memory, so the
+figures include formatting but not disk or console I/O.
+
+    python benchmarks/bench_hot_path_logging.py [--db data/market.db] [--listings 20000]
+"""
+import argparse
+import contextlib
+import functools
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_gem_parser import synthesize_listings, load_recorded_listings
+from src.config.constants import COURIERS
+from src.utils import parsing
+from src.utils.worker_logger import WorkerLogger
+
+PAGE_SIZE = 100
+
+class _Counter(logging.Filter):
+    def __init__(self):
+        super().__init__()
+        self.records = 0
+
+    def filter(self, record):
+        self.records += 1
+        return True
+
+def process_pages(pages):
+    for page in pages:
+        worker_logger = WorkerLogger('item_service', 'http://127.0.0.1:8080', page[0].item.description.market_name)
+        records, parsed_ids = parsing.parse_market_listings(page)
+        for record in records:
+            worker_logger.debug("Parsed record: %s", record)
+        worker_logger.info(
+            "Parsed %d listings: %d with gems, %d unparsed raw listings removed, %d unchanged skipped",
+            len(page), len(records), len(page) - len(parsed_ids), 0,
+            fields={'listings': len(page), 'items': len(records), 'removed': len(page) - len(parsed_ids), 'unchanged': 0}
+        )
+
+class _BaselineWorkerLogger:
+    """WorkerLogger as it was: prefix and extra built eagerly, for every level."""
+    def __init__(self, service_name, proxy, item_name=None):
+        self.logger = logging.getLogger(service_name)
+        self.proxy = proxy
+        self.item_name = item_name
+
+    def _format_message(self, message):
+        prefix = f"[Worker {self.proxy}]"
+        if self.item_name:
+            prefix += f" [{self.item_name}]"
+        return f"{prefix} {message}"
+
+    def info(self, message):
+        self.logger.info(self._format_message(message), extra={"worker_info": {"proxy": self.proxy, "item": self.item_name}})
+
+    def debug(self, message):
+        self.logger.debug(self._format_message(message), extra={"worker_info": {"proxy": self.proxy, "item": self.item_name}})
+
+@functools.lru_cache(maxsize=parsing.GEM_CACHE_SIZE)
+def _baseline_resolve_gems(item_description, description):
+    """resolve_gems with the logging and prints of its courier path before level gating."""
+    if item_description not in COURIERS:
+        return parsing.resolve_gems.__wrapped__(item_description, description)
+    gem_text = parsing.gem_text_of(description)
+    logging.getLogger('parsing').info(f"Gem text: {gem_text}")
+    print(f"Gem text: {gem_text}")
+    ethereal_gem, prismatic_gem = parsing.parse_gem_text_both_gems(gem_text)
+    # parse_gem_text_both_gems printed its result
+    print(f"Processed Gem Text: {gem_text}")
+    print(f"Matched Ethereal Gem: {ethereal_gem}")
+    print(f"Matched Prismatic Gem: {prismatic_gem}")
+    print("-" * 50)
+    return ethereal_gem, prismatic_gem
+
+def _baseline_parse(market_listings):
+    """iter_market_listings with the logging and prints it had before level gating."""
+    logger = logging.getLogger('parsing')
+    logger.info(f"Starting to parse {len(market_listings)} market listings")
+    records = []
+    for listing in market_listings:
+        listing_id, item_description, price, description_values = parsing.listing_payload(listing)
+        logger.info(f"Processing listing: {item_description}")
+        ethereal_gem = prismatic_gem = None
+        if item_description in COURIERS:
+            for value in description_values:
+                if "Gem" in value:
+                    ethereal_gem, prismatic_gem = _baseline_resolve_gems(item_description, value)
+                    logger.info(f"Price: {price}")
+                    logger.info(f"ID: {listing_id}")
+                    logger.info(f"Item Description: {item_description}")
+                    print(price)
+                    print(listing_id)
+                    print(item_description)
+                    print(f"Ethereal Gem: {ethereal_gem}")
+                    print(f"Prismatic Gem: {prismatic_gem}")
+        else:
+            for value in description_values:
+                if "Gem" in value:
+                    ethereal_gem, prismatic_gem = _baseline_resolve_gems(item_description, value)
+                    break
+        if ethereal_gem or prismatic_gem:
+            logger.info(f"Found item with gems: {item_description} - E: {ethereal_gem}, P: {prismatic_gem}")
+            records.append(parsing.ParsedListing(listing_id, price, item_description, ethereal_gem, prismatic_gem))
+    logger.info(f"Finished parsing. Found {len(records)} items with gems")
+    return records
+
+def process_pages_baseline(pages):
+    for page in pages:
+        worker_logger = _BaselineWorkerLogger('item_service', 'http://127.0.0.1:8080', page[0].item.description.market_name)
+        records = _baseline_parse(page)
+        if records:
+            worker_logger.info(f"Found {len(records)} items with gems")
+        else:
+            worker_logger.info("No items with gems found in this batch.")
+        for record in records:
+            worker_logger.debug(f"Parsed record: {record}")
+        removed = len(page) - len(records)
+        if removed:
+            worker_logger.info(f"Cleaning up {removed} unparsed raw listings")
+
+def measure(process, pages, level):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    counter = _Counter()
+    handler.addFilter(counter)
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    # Start every run with cold gem caches
+    parsing.resolve_gems.cache_clear()
+    _baseline_resolve_gems.cache_clear()
+
+    printed = io.StringIO()
+    started = time.process_time()
+    with contextlib.redirect_stdout(printed):
+        process(pages)
+    elapsed = time.process_time() - started
+    return elapsed, counter.records, len(stream.getvalue().encode('utf-8')), len(printed.getvalue().encode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help="database with recorded raw_listings")
+    parser.add_argument('--listings', type=int, default=20000)
+    args = parser.parse_args()
+
+    listings = load_recorded_listings(args.db, args.listings) if args.db else synthesize_listings(args.listings)
+    pages = [listings[i:i + PAGE_SIZE] for i in range(0, len(listings), PAGE_SIZE)]
+
+    print(f"{len(listings)} listings in {len(pages)} pages")
+    runs = (
+        ("baseline (INFO)", process_pages_baseline, logging.INFO),
+        ("INFO (summaries)", process_pages, logging.INFO),
+        ("DEBUG (detail)", process_pages, logging.DEBUG),
+    )
+    results = {}
+    for name, process, level in runs:
+        elapsed, records, size, printed = measure(process, pages, level)
+        results[name] = (elapsed, records, size + printed)
+        print(f"{name:<17}: {records:>7} records  {size / 1024:>7,.0f} KiB logged  "
+              f"{printed / 1024:>6,.0f} KiB printed  {elapsed:.3f}s CPU")
+
+    old, new = results["baseline (INFO)"], results["INFO (summaries)"]
+    print(f"reduction at INFO : {old[1] / max(new[1], 1):,.0f}x fewer records, "
+          f"{old[2] / max(new[2], 1):,.0f}x fewer bytes, {old[0] / new[0]:.1f}x less CPU")
+
+if __name__ == '__main__':
+    main()
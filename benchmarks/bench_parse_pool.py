@@ -0,0 +1,92 @@
+"""
+Parse offload benchmark: pages of listings parsed on the event loop (as with
+PARSE_PROCESSES = 0) against pages handed to a ParsePool.
+
+Every simulated proxy waits ``--latency`` seconds for a page, parses it and
+asks for the next one, all on one event loop. A heartbeat task measures how
+late the loop wakes it up, which is the delay every other network callback
+sees while a page is being parsed. Both modes must produce identical records.
+
+    python benchmarks/bench_parse_pool.py [--db data/market.db] [--proxies 100] [--pages 20] [--processes 4]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_gem_parser import synthesize_listings, load_recorded_listings
+from src.utils.parsing import iter_market_listings
+from src.utils.parse_pool import ParsePool
+
+PAGE_SIZE = 100
+
+async def heartbeat(lags, interval=0.005):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+async def run(pages, proxies, latency, parse):
+    lags = []
+    beat = asyncio.create_task(heartbeat(lags))
+    results = [None] * len(pages)
+    cursor = iter(range(len(pages)))
+
+    async def proxy_worker():
+        for i in cursor:
+            await asyncio.sleep(latency)
+            results[i] = await parse(pages[i])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(proxy_worker() for _ in range(proxies)))
+    elapsed = time.perf_counter() - started
+    beat.cancel()
+    lags.sort()
+    return elapsed, lags, results
+
+async def parse_in_loop(page):
+    return list(iter_market_listings(page))
+
+def report(label, pages, elapsed, lags):
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    worst = lags[-1] if lags else 0.0
+    print(f"{label:<18}: {elapsed:.3f}s  {len(pages) / elapsed:,.0f} pages/s  "
+          f"loop lag p99 {p99 * 1000:.1f}ms  max {worst * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help="database with recorded raw_listings")
+    parser.add_argument('--proxies', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=20, help="pages per proxy")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated seconds per request")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    count = args.proxies * args.pages * PAGE_SIZE
+    listings = load_recorded_listings(args.db, count) if args.db else synthesize_listings(count)
+    pages = [listings[i:i + PAGE_SIZE] for i in range(0, len(listings), PAGE_SIZE)]
+
+    pool = ParsePool(args.processes)
+    # Start the workers outside the measurement
+    asyncio.run(pool.parse(pages[0]))
+    loop_time, loop_lags, expected = asyncio.run(run(pages, args.proxies, args.latency, parse_in_loop))
+    pool_time, pool_lags, actual = asyncio.run(run(pages, args.proxies, args.latency, pool.parse))
+    pool.close()
+
+    if expected != actual:
+        mismatched = sum(1 for e, a in zip(expected, actual) if e != a)
+        print(f"PARITY FAILED: {mismatched} of {len(pages)} pages differ")
+        sys.exit(1)
+
+    print(f"{len(pages)} pages of {PAGE_SIZE} over {args.proxies} proxies, "
+          f"{sum(len(page) for page in expected)} records, outputs identical")
+    report("in-loop", pages, loop_time, loop_lags)
+    report(f"{args.processes} processes", pages, pool_time, pool_lags)
+
+if __name__ == '__main__':
+    main()
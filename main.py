@@ -4,22 +4,33 @@ from datetime import datetime
 from src.config.settings import settings
 from src.database.models import init_db
 from src.database.repository import DatabaseRepository
+from src.services.persistence_service import PersistenceService
+from src.services.gem_cache import GemCache
+from src.utils.rate_limiter import RateLimiterRegistry
+from src.utils.client_pool import ClientPool
 from src.services.item_service import ItemService
 from src.services.gem_service import GemService
+from src.services.work_pool import WorkPool
 from src.services.monitoring_service import MonitoringService
+from src.services.streaming_evaluator import StreamingEvaluator
 from src.services.alert_service import AlertService
 from src.services.proxy_service import ProxyService
 from src.utils.logging import setup_logging
+from src.utils.steam_client import SteamMarketClient
 
 class Application:
     def __init__(self, item_service: ItemService, gem_service: GemService, 
                  monitoring_service: MonitoringService, alert_service: AlertService,
-                 proxy_service: ProxyService):
+                 proxy_service: ProxyService, db_repository: DatabaseRepository,
+                 persistence_service: PersistenceService, steam_client: SteamMarketClient):
+        self.db_repository = db_repository
+        self.persistence_service = persistence_service
         self.item_service = item_service
         self.gem_service = gem_service
         self.monitoring_service = monitoring_service
         self.alert_service = alert_service
         self.proxy_service = proxy_service
+        self.steam_client = steam_client
         self.logger = logging.getLogger('main')
         self._running = True  # Flag to control the main loop
         self._main_task = None  # Reference to the running task
@@ -27,6 +38,12 @@ class Application:
 
     async def run(self):
         self._main_task = asyncio.current_task()  # Store the running task
+        # Open the pooled database connections for the lifetime of the run
+        self.db_repository.open()
+        await self.persistence_service.start()
+        await self._load_proxy_health()
+        # Log the purchase client in ahead of the first profitable listing
+        self.steam_client.start_keep_alive()
         # Start Telegram bot polling as a background task
         bot_task = asyncio.create_task(self.alert_service.run_bot())
         await self.alert_service.send_startup_message()
@@ -43,23 +60,20 @@ class Application:
                         await asyncio.sleep(settings.ERROR_DELAY)
                         continue
 
-                    gem_proxies, item_proxies = self.proxy_service.distribute_proxies(proxies)
-
                     try:
-                        # Run item_service and gem_service concurrently
-                        await asyncio.gather(
-                            self.item_service.fetch_items(item_proxies),
-                            self.gem_service.fetch_gems(gem_proxies)
-                        )
+                        await self._fetch_cycle(proxies)
                         self.logger.info("Fetch services completed")
-
-                        # Run monitoring_service after both services are complete
-                        await self.monitoring_service.monitor_cycle()
-                        self.logger.info("Monitoring service completed")
                     finally:
-                        # Ensure proxies are always unlocked
-                        await self.proxy_service.cleanup_proxies()
-                        self.logger.info("Proxies unlocked")
+                        # Ensure proxies are always unlocked. Monitoring does not need them,
+                        # so the unlock runs in the background until the next get_proxies
+                        self.proxy_service.release_proxies()
+                        await self._save_proxy_health()
+
+                    # Run monitoring_service after both services are complete
+                    await self.monitoring_service.monitor_cycle()
+                    self.logger.info("Monitoring service completed")
+
+                    await self._prune_history()
 
                     self.logger.info(f"Waiting {settings.CYCLE_INTERVAL:.2f} seconds until next cycle")
                     await asyncio.sleep(settings.CYCLE_INTERVAL)
@@ -82,6 +96,72 @@ class Application:
                 await self.proxy_service.cleanup_proxies()
             except Exception as e:
                 self.logger.error(f"Error during final cleanup: {str(e)}", exc_info=True)
+            try:
+                await self.steam_client.close()
+            except Exception as e:
+                self.logger.error(f"Error closing purchase client: {str(e)}", exc_info=True)
+            try:
+                await self.item_service.clients.close()
+            except Exception as e:
+                self.logger.error(f"Error closing HTTP sessions: {str(e)}", exc_info=True)
+            try:
+                await self.item_service.close()
+            except Exception as e:
+                self.logger.error(f"Error stopping parse processes: {str(e)}", exc_info=True)
+            # Drain queued writes before the connections go away
+            try:
+                await self.persistence_service.close()
+            except Exception as e:
+                self.logger.error(f"Error draining pending writes: {str(e)}", exc_info=True)
+            self.db_repository.close()
+
+    async def _fetch_cycle(self, proxies):
+        """Fetch items and gems for one cycle."""
+        # Keep warm sessions for proxies still in rotation, close the rest
+        await self.item_service.clients.retain(proxies)
+        if getattr(settings, 'WORK_STEALING', True):
+            # Every proxy serves both lanes, so none sits idle once its own workload runs dry
+            item_lane, gem_lane = await asyncio.gather(
+                self.item_service.start_cycle(),
+                self.gem_service.start_cycle()
+            )
+            await WorkPool([item_lane, gem_lane], self.item_service.rate_limiters, self.item_service.clients).run(proxies)
+            await asyncio.gather(
+                self.item_service.finish_cycle(),
+                self.gem_service.finish_cycle()
+            )
+            return
+
+        gem_proxies, item_proxies = self.proxy_service.distribute_proxies(proxies)
+        # Run item_service and gem_service concurrently on fixed proxy splits
+        await asyncio.gather(
+            self.item_service.fetch_items(item_proxies),
+            self.gem_service.fetch_gems(gem_proxies)
+        )
+
+    async def _load_proxy_health(self):
+        try:
+            stats = await asyncio.get_running_loop().run_in_executor(None, self.db_repository.get_all_proxy_health)
+            self.proxy_service.load_health(stats)
+        except Exception as e:
+            self.logger.error(f"Error loading proxy health: {str(e)}", exc_info=True)
+
+    async def _save_proxy_health(self):
+        try:
+            await self.persistence_service.call(self.db_repository.save_proxy_health_bulk, self.proxy_service.health_snapshot())
+        except Exception as e:
+            self.logger.error(f"Error saving proxy health: {str(e)}", exc_info=True)
+
+    async def _prune_history(self):
+        """Drop raw listings and fetch cycles that are past their retention window."""
+        try:
+            cutoff = datetime.now().timestamp() - getattr(settings, 'RAW_LISTING_RETENTION', 86400)
+            removed = await self.persistence_service.call(self.db_repository.prune_raw_listings, cutoff)
+            keep_cycles = getattr(settings, 'FETCH_TIMESTAMP_RETENTION', 1000)
+            removed_cycles = await self.persistence_service.call(self.db_repository.prune_fetch_timestamps, keep_cycles)
+            self.logger.info(f"Pruned {removed} raw listings and {removed_cycles} fetch cycles")
+        except Exception as e:
+            self.logger.error(f"Error pruning history: {str(e)}", exc_info=True)
 
     def stop(self):
         # Set the running flag to False.
@@ -99,11 +179,18 @@ async def main():
     db_repository = DatabaseRepository()
     alert_service = AlertService()
     proxy_service = ProxyService()
-    item_service = ItemService(db_repository)
-    gem_service = GemService(db_repository)
-    monitoring_service = MonitoringService(db_repository, alert_service)
+    persistence_service = PersistenceService(db_repository)
+    gem_cache = GemCache(db_repository)
+    rate_limiters = RateLimiterRegistry(proxy_service)
+    clients = ClientPool()
+    steam_client = SteamMarketClient()
+    monitoring_service = MonitoringService(db_repository, alert_service, gem_cache, steam_client)
+    evaluator = StreamingEvaluator(monitoring_service) if getattr(settings, 'STREAMING_PURCHASES', False) else None
+    item_service = ItemService(db_repository, persistence_service, rate_limiters, clients, evaluator)
+    gem_service = GemService(db_repository, persistence_service, gem_cache, rate_limiters, clients)
     
-    app = Application(item_service, gem_service, monitoring_service, alert_service, proxy_service)
+    app = Application(item_service, gem_service, monitoring_service, alert_service, proxy_service, db_repository,
+                      persistence_service, steam_client)
     
     # Create the main task
     main_task = asyncio.create_task(app.run())
@@ -1,8 +1,108 @@
+import ast
 import sqlite3
+from typing import Optional
 from ..config.settings import settings
+from ..utils.order_book import encode_buy_orders
+
+def connect(db_path: Optional[str] = None, read_only: bool = False) -> sqlite3.Connection:
+    """
+    Open a connection to the application database with the tuned pragmas applied.
+    Connections are shared between the event loop and worker threads, so the
+    same-thread check is disabled; callers are responsible for serializing access.
+    """
+    conn = sqlite3.connect(
+        db_path or settings.DATABASE_PATH,
+        timeout=getattr(settings, 'DB_BUSY_TIMEOUT', 30.0),
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{int(getattr(settings, 'DB_CACHE_SIZE_KB', 65536))}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+def _pack_gem_buy_orders(conn: sqlite3.Connection) -> None:
+    """Rebuild the gems table with a BLOB buy_orders column, packing the old str(list) values."""
+    conn.execute("""
+    CREATE TABLE gems_packed (
+        name TEXT PRIMARY KEY,
+        buy_orders BLOB NOT NULL,
+        buy_order_length INTEGER NOT NULL,
+        timestamp REAL NOT NULL
+    )
+    """)
+    rows = conn.execute("SELECT name, buy_orders, buy_order_length, timestamp FROM gems").fetchall()
+    packed = []
+    for name, buy_orders, buy_order_length, timestamp in rows:
+        if isinstance(buy_orders, str):
+            try:
+                buy_orders = encode_buy_orders(ast.literal_eval(buy_orders) or [])
+            except (ValueError, SyntaxError):
+                buy_orders, buy_order_length = encode_buy_orders([]), 0
+        packed.append((name, buy_orders, buy_order_length, timestamp))
+    conn.executemany("INSERT INTO gems_packed VALUES (?, ?, ?, ?)", packed)
+    conn.execute("DROP TABLE gems")
+    conn.execute("ALTER TABLE gems_packed RENAME TO gems")
+
+# Schema migrations, applied in order. Entry N upgrades a database whose
+# PRAGMA user_version is N to version N + 1. An entry is either a list of
+# SQL statements or a callable that receives the connection.
+MIGRATIONS = [
+    # 1: indexes for the monitoring time-range query, gem joins and pruning
+    [
+        "CREATE INDEX IF NOT EXISTS idx_items_timestamp ON items (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_items_prismatic_gem ON items (prismatic_gem)",
+        "CREATE INDEX IF NOT EXISTS idx_items_ethereal_gem ON items (ethereal_gem)",
+        "CREATE INDEX IF NOT EXISTS idx_raw_listings_fetch_timestamp ON raw_listings (fetch_timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_comparisons_profitable_timestamp ON comparisons (is_profitable, timestamp)",
+    ],
+    # 2: gem buy orders stored as a packed binary ladder instead of str(list)
+    _pack_gem_buy_orders,
+    # 3: per-proxy health statistics kept across cycles
+    [
+        """
+        CREATE TABLE IF NOT EXISTS proxy_health (
+            proxy TEXT PRIMARY KEY,
+            requests INTEGER NOT NULL,
+            successes INTEGER NOT NULL,
+            failures INTEGER NOT NULL,
+            throttles INTEGER NOT NULL,
+            consecutive_failures INTEGER NOT NULL,
+            latency REAL,
+            quarantined_until REAL NOT NULL,
+            quarantine_count INTEGER NOT NULL,
+            timestamp REAL
+        )
+        """,
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Upgrade the schema in place to SCHEMA_VERSION and return the resulting version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        conn.execute("BEGIN")
+        try:
+            migration = MIGRATIONS[target - 1]
+            if callable(migration):
+                migration(conn)
+            else:
+                for statement in migration:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    return version
 
 def init_db():
-    conn = sqlite3.connect(settings.DATABASE_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -18,7 +118,7 @@ def init_db():
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS gems (
         name TEXT PRIMARY KEY,
-        buy_orders TEXT NOT NULL,
+        buy_orders BLOB NOT NULL,
         buy_order_length INTEGER NOT NULL,
         timestamp REAL NOT NULL
     )
@@ -50,4 +150,5 @@ def init_db():
     )
     """)
     conn.commit()
+    migrate(conn)
     conn.close()
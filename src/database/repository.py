@@ -1,28 +1,109 @@
 import sqlite3
+import queue
+import threading
 from contextlib import contextmanager
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Iterable, Any, Dict
 from ..config.settings import settings
 from ..models.item import Item
 from ..models.gem import Gem
 from ..models.comparison import Comparison
+from ..models.proxy_health import ProxyHealth
+from .models import connect
+from ..utils.order_book import top_of_book, TOP_OF_BOOK_SIZE
 import logging
 import pickle
 
 class DatabaseRepository:
+    """
+    Repository backed by a small pool of long-lived SQLite connections:
+    a single writer connection guarded by a lock and up to
+    ``DB_READER_POOL_SIZE`` read-only connections. The database runs in WAL
+    mode so readers never block on the writer.
+    """
     def __init__(self):
         self.db_path = settings.DATABASE_PATH
         self.logger = logging.getLogger('database')
-        
+        self.reader_pool_size = max(1, int(getattr(settings, 'DB_READER_POOL_SIZE', 4)))
+        self._writer: Optional[sqlite3.Connection] = None
+        # Re-entrant so write_connection blocks can nest into one transaction
+        self._writer_lock = threading.RLock()
+        self._write_depth = 0
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._reader_count = 0
+        self._pool_lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open the writer connection. Readers are created lazily on demand."""
+        with self._pool_lock:
+            if self._writer is None:
+                self._writer = connect(self.db_path)
+                self.logger.info(f"Opened database connection pool for {self.db_path}")
+
+    def close(self) -> None:
+        """Close every pooled connection. The pool can be reopened afterwards."""
+        with self._pool_lock:
+            with self._writer_lock:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._reader_count = 0
+        self.logger.info("Closed database connection pool")
+
     @contextmanager
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+    def write_connection(self):
+        """
+        Yield the writer connection inside a single transaction. Blocks nested
+        on the same thread join the outer transaction, which commits or rolls
+        back all of them together.
+        """
+        if self._writer is None:
+            self.open()
+        with self._writer_lock:
+            conn = self._writer
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._write_depth -= 1
+                return
+            self._write_depth = 1
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._write_depth = 0
+
+    @contextmanager
+    def read_connection(self):
+        """Borrow a read-only connection from the pool."""
+        conn = None
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                if self._reader_count < self.reader_pool_size:
+                    self._reader_count += 1
+                    conn = connect(self.db_path, read_only=True)
+        if conn is None:
+            conn = self._readers.get()
         try:
             yield conn
         finally:
-            conn.close()
-            
+            # End any implicit read transaction so the WAL can be checkpointed
+            conn.rollback()
+            self._readers.put(conn)
+
     def save_item(self, item: Item) -> None:
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR REPLACE INTO items
@@ -32,10 +113,23 @@ class DatabaseRepository:
                 item.id, item.name, item.price, 
                 item.ethereal_gem, item.prismatic_gem, item.timestamp
             ))
-            conn.commit()
             
+    def save_items_bulk(self, items: Iterable[Item]) -> None:
+        rows = [
+            (item.id, item.name, item.price, item.ethereal_gem, item.prismatic_gem, item.timestamp)
+            for item in items
+        ]
+        if not rows:
+            return
+        with self.write_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO items
+                (id, name, price, ethereal_gem, prismatic_gem, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+
     def get_item(self, item_id: str) -> Optional[Item]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT id, name, price, ethereal_gem, prismatic_gem, timestamp
@@ -48,7 +142,7 @@ class DatabaseRepository:
             return None
         
     def get_all_items(self) -> List[Item]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT id, name, price, ethereal_gem, prismatic_gem, timestamp
@@ -58,7 +152,7 @@ class DatabaseRepository:
             return [Item(*row) for row in rows]
         
     def save_gem(self, gem: Gem) -> None:
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR REPLACE INTO gems
@@ -67,10 +161,20 @@ class DatabaseRepository:
             """, (
                 gem.name, gem.buy_orders, gem.buy_order_length, gem.timestamp
             ))
-            conn.commit()
+            
+    def save_gems_bulk(self, gems: Iterable[Gem]) -> None:
+        rows = [(gem.name, gem.buy_orders, gem.buy_order_length, gem.timestamp) for gem in gems]
+        if not rows:
+            return
+        with self.write_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO gems
+                (name, buy_orders, buy_order_length, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, rows)
             
     def get_gem(self, gem_name: str) -> Optional[Gem]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT name, buy_orders, buy_order_length, timestamp
@@ -82,8 +186,47 @@ class DatabaseRepository:
                 return Gem(*row)
             return None
         
+    def get_all_gems(self) -> List[Gem]:
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT name, buy_orders, buy_order_length, timestamp
+                FROM gems
+            """)
+            rows = cursor.fetchall()
+            return [Gem(*row) for row in rows]
+
+    def get_gem_top_of_book(self, gem_name: str) -> Optional[Tuple[float, int]]:
+        """Best buy order of a gem, read from the head of the packed ladder only."""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT substr(buy_orders, 1, ?)
+                FROM gems
+                WHERE name = ?
+            """, (TOP_OF_BOOK_SIZE, gem_name))
+            row = cursor.fetchone()
+            if row:
+                return top_of_book(row[0])
+            return None
+
+    def get_all_top_of_book(self) -> Dict[str, Tuple[float, int]]:
+        """Best buy order of every gem that has at least one."""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT name, substr(buy_orders, 1, ?)
+                FROM gems
+            """, (TOP_OF_BOOK_SIZE,))
+            result = {}
+            for name, head in cursor.fetchall():
+                top = top_of_book(head)
+                if top is not None:
+                    result[name] = top
+            return result
+        
     def save_comparison(self, comparison: Comparison) -> None:
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR REPLACE INTO comparisons
@@ -95,10 +238,28 @@ class DatabaseRepository:
                 comparison.prismatic_gem_price, comparison.ethereal_gem_price,
                 comparison.combined_gem_price, comparison.expected_profit
             ))
-            conn.commit()
             
+    def save_comparisons_bulk(self, comparisons: Iterable[Comparison]) -> None:
+        rows = [
+            (
+                comparison.item_id, comparison.item_price, comparison.is_profitable, comparison.timestamp,
+                comparison.prismatic_gem_price, comparison.ethereal_gem_price,
+                comparison.combined_gem_price, comparison.expected_profit
+            )
+            for comparison in comparisons
+        ]
+        if not rows:
+            return
+        with self.write_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO comparisons
+                (item_id, item_price, is_profitable, timestamp, 
+                 prismatic_gem_price, ethereal_gem_price, combined_gem_price, expected_profit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
     def get_comparison(self, item_id: str) -> Optional[Comparison]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT item_id, item_price, is_profitable, timestamp,
@@ -112,16 +273,15 @@ class DatabaseRepository:
             return None
         
     def save_fetch_timestamps(self, fetch_start: float, fetch_end: float) -> None:
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO fetch_timestamps (fetch_start_timestamp, fetch_end_timestamp)
                 VALUES (?, ?)
             """, (fetch_start, fetch_end))
-            conn.commit()
             
     def get_last_fetch_timestamps(self) -> Tuple[Optional[float], Optional[float]]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT fetch_start_timestamp, fetch_end_timestamp
@@ -134,8 +294,17 @@ class DatabaseRepository:
                 return row
             return None, None
         
+    def prune_fetch_timestamps(self, keep_last: int) -> int:
+        """Delete all but the ``keep_last`` most recent fetch cycles. Returns the number of rows removed."""
+        with self.write_connection() as conn:
+            cursor = conn.execute("""
+                DELETE FROM fetch_timestamps
+                WHERE id <= (SELECT COALESCE(MAX(id), 0) FROM fetch_timestamps) - ?
+            """, (keep_last,))
+            return cursor.rowcount
+        
     def get_items_in_timerange(self, start_time: float, end_time: float) -> List[Item]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT id, name, price, ethereal_gem, prismatic_gem, timestamp
@@ -145,8 +314,36 @@ class DatabaseRepository:
             rows = cursor.fetchall()
             return [Item(*row) for row in rows]
 
+    def get_listing_prices(self, since: float) -> Dict[str, float]:
+        """Prices of the items (listings with gems) seen since ``since``, keyed by listing ID."""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, price
+                FROM items
+                WHERE timestamp >= ?
+            """, (since,))
+            return dict(cursor.fetchall())
+
+    def refresh_listing_timestamps(self, listing_ids: Iterable[str], timestamp: float) -> None:
+        """Mark known, unchanged listings as seen at ``timestamp`` in both items and raw_listings."""
+        rows = [(timestamp, listing_id) for listing_id in listing_ids]
+        if not rows:
+            return
+        with self.write_connection() as conn:
+            conn.executemany("""
+                UPDATE items
+                SET timestamp = ?
+                WHERE id = ?
+            """, rows)
+            conn.executemany("""
+                UPDATE raw_listings
+                SET fetch_timestamp = ?
+                WHERE id = ?
+            """, rows)
+
     def save_raw_listing(self, listing_id: str, listing_obj, timestamp: float) -> None:
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             pickled_data = pickle.dumps(listing_obj)
             cursor.execute("""
@@ -154,10 +351,21 @@ class DatabaseRepository:
                 (id, listing_data, fetch_timestamp)
                 VALUES (?, ?, ?)
             """, (listing_id, pickled_data, timestamp))
-            conn.commit()
+    
+    def save_raw_listings_bulk(self, listings: Iterable[Any], timestamp: float) -> None:
+        """Store a page of raw listings (objects exposing ``.id``) in one transaction."""
+        rows = [(listing.id, pickle.dumps(listing), timestamp) for listing in listings]
+        if not rows:
+            return
+        with self.write_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO raw_listings
+                (id, listing_data, fetch_timestamp)
+                VALUES (?, ?, ?)
+            """, rows)
     
     def get_raw_listing(self, listing_id: str):
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT listing_data
@@ -169,14 +377,48 @@ class DatabaseRepository:
                 return pickle.loads(row[0])
             return None
 
+    def prune_raw_listings(self, older_than: float) -> int:
+        """Delete raw listings fetched before ``older_than``. Returns the number of rows removed."""
+        with self.write_connection() as conn:
+            cursor = conn.execute("""
+                DELETE FROM raw_listings
+                WHERE fetch_timestamp < ?
+            """, (older_than,))
+            return cursor.rowcount
+
     def remove_raw_listings(self, listing_ids: set) -> None:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            # SQLite doesn't support multiple values in IN clause directly
-            # so we need to create the placeholders
-            placeholders = ','.join('?' * len(listing_ids))
-            cursor.execute(f"""
+        if not listing_ids:
+            return
+        with self.write_connection() as conn:
+            # One statement per id keeps large, coalesced id sets below
+            # SQLite's bound-parameter limit
+            conn.executemany("""
                 DELETE FROM raw_listings
-                WHERE id IN ({placeholders})
-            """, tuple(listing_ids))
-            conn.commit()
+                WHERE id = ?
+            """, [(listing_id,) for listing_id in listing_ids])
+
+    def save_proxy_health_bulk(self, stats: Iterable[ProxyHealth]) -> None:
+        rows = [
+            (h.proxy, h.requests, h.successes, h.failures, h.throttles, h.consecutive_failures,
+             h.latency, h.quarantined_until, h.quarantine_count, h.timestamp)
+            for h in stats
+        ]
+        if not rows:
+            return
+        with self.write_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO proxy_health
+                (proxy, requests, successes, failures, throttles, consecutive_failures,
+                 latency, quarantined_until, quarantine_count, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def get_all_proxy_health(self) -> List[ProxyHealth]:
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT proxy, requests, successes, failures, throttles, consecutive_failures,
+                       latency, quarantined_until, quarantine_count, timestamp
+                FROM proxy_health
+            """)
+            return [ProxyHealth(*row) for row in cursor.fetchall()]
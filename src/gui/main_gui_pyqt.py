@@ -17,9 +17,16 @@ from src import Application, init_db
 from src.database.repository import DatabaseRepository
 from src.services.alert_service import AlertService
 from src.services.proxy_service import ProxyService
+from src.services.persistence_service import PersistenceService
+from src.services.gem_cache import GemCache
+from src.utils.rate_limiter import RateLimiterRegistry
+from src.config.settings import settings
+from src.utils.client_pool import ClientPool
+from src.utils.steam_client import SteamMarketClient
 from src.services.item_service import ItemService
 from src.services.gem_service import GemService
 from src.services.monitoring_service import MonitoringService
+from src.services.streaming_evaluator import StreamingEvaluator
 from src.utils import logging as log_util
 
 class MainWindow(QMainWindow):
@@ -44,12 +51,19 @@ class MainWindow(QMainWindow):
         db_repository = DatabaseRepository()
         alert_service = AlertService()
         proxy_service = ProxyService()
-        item_service = ItemService(db_repository)
-        gem_service = GemService(db_repository)
-        monitoring_service = MonitoringService(db_repository, alert_service)
+        persistence_service = PersistenceService(db_repository)
+        gem_cache = GemCache(db_repository)
+        rate_limiters = RateLimiterRegistry(proxy_service)
+        clients = ClientPool()
+        steam_client = SteamMarketClient()
+        monitoring_service = MonitoringService(db_repository, alert_service, gem_cache, steam_client)
+        evaluator = StreamingEvaluator(monitoring_service) if getattr(settings, 'STREAMING_PURCHASES', False) else None
+        item_service = ItemService(db_repository, persistence_service, rate_limiters, clients, evaluator)
+        gem_service = GemService(db_repository, persistence_service, gem_cache, rate_limiters, clients)
         
         # Create the Application instance.
-        self.application = Application(item_service, gem_service, monitoring_service, alert_service, proxy_service)
+        self.application = Application(item_service, gem_service, monitoring_service, alert_service, proxy_service,
+                                       db_repository, persistence_service, steam_client)
         
         self.setup_ui()
         self.start_timers()
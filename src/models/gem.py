@@ -1,13 +1,24 @@
 from dataclasses import dataclass
-from typing import List
+from functools import cached_property
+from typing import List, Optional, Sequence, Tuple
+from ..utils.order_book import encode_buy_orders, decode_buy_orders, top_of_book
 
 @dataclass
 class Gem:
     name: str
-    buy_orders: str
+    buy_orders: bytes
     buy_order_length: int
     timestamp: float
-    
-    @property
+
+    @classmethod
+    def from_orders(cls, name: str, orders: Sequence[Sequence[float]], buy_order_length: int, timestamp: float) -> "Gem":
+        return cls(name, encode_buy_orders(orders), buy_order_length, timestamp)
+
+    @cached_property
     def parsed_buy_orders(self) -> List[List[float]]:
-        return eval(self.buy_orders)
+        # Decoded once per instance; buy_orders is not expected to change afterwards
+        return decode_buy_orders(self.buy_orders)
+
+    @property
+    def top_buy_order(self) -> Optional[Tuple[float, int]]:
+        return top_of_book(self.buy_orders)
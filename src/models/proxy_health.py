@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class ProxyHealth:
+    proxy: str
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    throttles: int = 0
+    consecutive_failures: int = 0
+    latency: Optional[float] = None
+    quarantined_until: float = 0.0
+    quarantine_count: int = 0
+    timestamp: Optional[float] = None
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace-smoothed so a proxy with no history starts at 0.5
+        return (self.successes + 1) / (self.requests + 2)
+
+    @property
+    def throttle_rate(self) -> float:
+        return self.throttles / self.requests if self.requests else 0.0
@@ -0,0 +1,78 @@
+import logging
+from typing import Dict, Optional, Tuple
+from ..database.repository import DatabaseRepository
+from ..models.gem import Gem
+from .gem_valuation import GemLadder
+
+class GemCache:
+    """
+    In-memory snapshot of the gems table keyed by gem name.
+
+    Loading reads only the top of book of every gem (the head of each packed
+    ladder), which is all most items need to be priced. Full gems, and the
+    ladders built from them, are read on first use and kept, and GemService
+    keeps the snapshot current as it saves gems, so monitoring can price
+    items without decoding every histogram. GemService invalidates it when a
+    gem fetch cycle lands; the next reader reloads it.
+    """
+    def __init__(self, db_repository: DatabaseRepository):
+        self.db_repository = db_repository
+        self.logger = logging.getLogger('gem_cache')
+        self._tops: Dict[str, Tuple[float, int]] = {}
+        # Full gems read so far; None marks a gem that is not in the database
+        self._gems: Dict[str, Optional[Gem]] = {}
+        self._ladders: Dict[str, GemLadder] = {}
+        self._loaded = False
+        self.generation = 0
+
+    def ensure_loaded(self) -> None:
+        """Load a fresh snapshot if the cache was never loaded or has been invalidated."""
+        if not self._loaded:
+            self.load()
+
+    def load(self) -> None:
+        self._tops = self.db_repository.get_all_top_of_book()
+        self._gems = {}
+        self._ladders = {}
+        self._loaded = True
+        self.generation += 1
+        self.logger.info(f"Loaded top of book of {len(self._tops)} gems into cache (generation {self.generation})")
+
+    def invalidate(self) -> None:
+        self._loaded = False
+
+    def update(self, gem: Gem) -> None:
+        """Apply a freshly saved gem to the snapshot."""
+        self._gems[gem.name] = gem
+        top_buy_order = gem.top_buy_order
+        if top_buy_order is not None:
+            self._tops[gem.name] = top_buy_order
+        else:
+            self._tops.pop(gem.name, None)
+        self._ladders.pop(gem.name, None)
+
+    def get(self, gem_name: Optional[str]) -> Optional[Gem]:
+        """Full gem with its ladder, read from the database on first use."""
+        if not gem_name:
+            return None
+        if gem_name not in self._gems:
+            self._gems[gem_name] = self.db_repository.get_gem(gem_name)
+        return self._gems[gem_name]
+
+    def top_buy_price(self, gem_name: Optional[str]) -> Optional[float]:
+        if not gem_name:
+            return None
+        top_buy_order = self._tops.get(gem_name)
+        return top_buy_order[0] if top_buy_order else None
+
+    def ladder(self, gem_name: Optional[str]) -> Optional[GemLadder]:
+        """Cumulative buy-order ladder of a gem, built on first use."""
+        gem = self.get(gem_name)
+        if gem is None:
+            return None
+        if gem_name not in self._ladders:
+            self._ladders[gem_name] = GemLadder(gem.parsed_buy_orders)
+        return self._ladders[gem_name]
+
+    def __len__(self) -> int:
+        return len(self._tops)
@@ -0,0 +1,68 @@
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+class GemLadder:
+    """
+    Cumulative view of a gem's buy-order ladder, best price first.
+
+    Quantities from process_histogram are incremental per price level; the
+    ladder keeps their running total so the level that fills the k-th unit is
+    a binary search away.
+    """
+    def __init__(self, orders: Sequence[Sequence[float]]):
+        if orders:
+            ladder = np.asarray(orders, dtype=np.float64)
+            self.prices = ladder[:, 0]
+            self.cumulative = np.cumsum(np.clip(ladder[:, 1], 0, None))
+        else:
+            self.prices = np.empty(0, dtype=np.float64)
+            self.cumulative = np.empty(0, dtype=np.float64)
+
+    @property
+    def depth(self) -> int:
+        """Total number of units the ladder can absorb."""
+        return int(self.cumulative[-1]) if len(self.cumulative) else 0
+
+    def unit_price(self, k: int) -> Optional[float]:
+        """Price received for the k-th unit sold (1-based), or None once the book is exhausted."""
+        level = int(np.searchsorted(self.cumulative, k, side='left'))
+        if k < 1 or level >= len(self.prices):
+            return None
+        return float(self.prices[level])
+
+    def realizable_value(self, units: int) -> float:
+        """Total proceeds of selling ``units`` into the book, walking down the levels."""
+        units = min(units, self.depth)
+        if units <= 0:
+            return 0.0
+        level = int(np.searchsorted(self.cumulative, units, side='left'))
+        filled_before = self.cumulative[level - 1] if level else 0.0
+        full_levels = np.diff(self.cumulative[:level], prepend=0.0) @ self.prices[:level] if level else 0.0
+        return float(full_levels + (units - filled_before) * self.prices[level])
+
+    def average_price(self, units: int) -> Optional[float]:
+        """Volume-weighted price of selling ``units``, or None if the book cannot absorb them."""
+        if units <= 0 or units > self.depth:
+            return None
+        return self.realizable_value(units) / units
+
+class GemAllocation:
+    """
+    Tracks how many units of each gem the current pass has already committed to
+    sell, and prices the next unit from the corresponding ladder. Summed over
+    allocated units, the marginal prices equal the ladder's volume-weighted
+    realizable value. A gem's ladder may be replaced when its book is refreshed;
+    the units allocated to it so far are kept.
+    """
+    def __init__(self, ladders: Dict[str, GemLadder]):
+        self.ladders = ladders
+        self.allocated: Dict[str, int] = {}
+
+    def next_unit_price(self, gem_name: Optional[str]) -> Optional[float]:
+        if not gem_name or gem_name not in self.ladders:
+            return None
+        return self.ladders[gem_name].unit_price(self.allocated.get(gem_name, 0) + 1)
+
+    def allocate(self, gem_name: Optional[str]) -> None:
+        if gem_name:
+            self.allocated[gem_name] = self.allocated.get(gem_name, 0) + 1
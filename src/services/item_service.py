@@ -1,236 +1,264 @@
 import asyncio
 import logging
-from typing import List
-from aiosteampy import SteamPublicClient, App, Currency
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from aiosteampy import SteamPublicClient, App
 from ..config.settings import settings
 from ..config.constants import ITEMS, COURIERS, ALLOWED_GEMS_ETHEREAL, ALLOWED_GEMS_PRISMATIC
 from ..database.repository import DatabaseRepository
+from .persistence_service import PersistenceService
+from .listing_index import ListingIndex
+from .work_pool import WorkPool, WorkLane, ProxyWorker
 from ..models.item import Item
-from ..utils.parsing import parse_market_listings
+from ..utils.parsing import iter_market_listings, resolve_gems, gem_cache_hit_rate
 from ..utils.worker_logger import WorkerLogger
+from ..utils.rate_limiter import RateLimiterRegistry, AdaptiveRateLimiter
+from ..utils.client_pool import ClientPool
+from ..utils.parse_pool import ParsePool
 from datetime import datetime
-import pandas as pd
+
+if TYPE_CHECKING:
+    # Only for annotations: importing it pulls in monitoring, alerts and the purchase client
+    from .streaming_evaluator import StreamingEvaluator
+
+# Item lane priorities: lower values are served first
+_BATCH_PRIORITY = 0
+_TOTAL_PRIORITY = 1
 
 class ItemService:
-    def __init__(self, db_repository: DatabaseRepository):
+    def __init__(self, db_repository: DatabaseRepository, persistence_service: PersistenceService,
+                 rate_limiters: RateLimiterRegistry, clients: ClientPool,
+                 evaluator: Optional['StreamingEvaluator'] = None):
         self.db_repository = db_repository
+        self.persistence_service = persistence_service
+        self.rate_limiters = rate_limiters
+        self.clients = clients
+        # Optional fast path that prices and buys items as soon as they are parsed
+        self.evaluator = evaluator
+        self.listing_index = ListingIndex(db_repository)
+        self.delta_scraping = getattr(settings, 'DELTA_SCRAPING', True)
+        # Parse pages in worker processes instead of on the event loop (0 = in-loop)
+        parse_processes = int(getattr(settings, 'PARSE_PROCESSES', 0))
+        self.parse_pool = ParsePool(parse_processes) if parse_processes > 0 else None
+        self._fetch_start = None
         self.logger = logging.getLogger('item_service')
         
     async def fetch_items(self, proxies: List[str]):
-        total_listings_queue = asyncio.Queue()
-        processing_queue = asyncio.Queue()
-        fetch_start = datetime.now().timestamp()
-        
-        # Queue all items for total count fetching
+        """Run a full item cycle on a dedicated set of proxies."""
+        lane = await self.start_cycle()
+        await WorkPool([lane], self.rate_limiters, self.clients).run(proxies)
+        await self.finish_cycle()
+
+    async def close(self):
+        """Stop the parse processes, if any."""
+        if self.parse_pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.parse_pool.close)
+
+    async def start_cycle(self) -> WorkLane:
+        """
+        Prepare an item cycle and return its work lane, seeded with one
+        total-count task per item. Listing batches (priority 0) are picked up as
+        soon as a total-count task (priority 1) produces them, so proxies never
+        idle while the last totals trickle in.
+        """
+        self._fetch_start = datetime.now().timestamp()
+        if self.delta_scraping:
+            await asyncio.get_running_loop().run_in_executor(None, self.listing_index.ensure_loaded)
+            self.listing_index.start_cycle()
+        if self.evaluator is not None:
+            await self.evaluator.start_cycle()
+
+        lane = WorkLane('item', self._process_task, weight=getattr(settings, 'ITEM_LANE_WEIGHT', 1.0))
         for item in ITEMS + COURIERS:
-            await total_listings_queue.put(item)
-            
-        # Add stop signals for total listings fetchers
-        for _ in proxies:
-            await total_listings_queue.put(None)
-            
-        # Create and start total listings fetchers
-        total_fetchers = [
-            self._total_listings_fetcher(total_listings_queue, processing_queue, proxy)
-            for proxy in proxies
-        ]
-        
-        # Wait for all total counts to be fetched and split into batches
-        await asyncio.gather(*total_fetchers)
-        
-        # Add stop signals for processors after all listings are queued
-        for _ in proxies:
-            await processing_queue.put(None)
-            
-        # Create and start item processors
-        processors = [
-            self._item_processor(processing_queue, proxy)
-            for proxy in proxies
-        ]
-        
-        # Wait for all processors to complete
-        await asyncio.gather(*processors)
+            lane.put({'type': 'total', 'item': item}, _TOTAL_PRIORITY)
+        return lane
+
+    async def finish_cycle(self):
+        """Close the item cycle once its lane has drained."""
+        if self.delta_scraping:
+            self.listing_index.end_cycle()
         
         fetch_end = datetime.now().timestamp()
         
-        # Save fetch timestamps to the database
-        self.db_repository.save_fetch_timestamps(fetch_start, fetch_end)
-        
-    async def _total_listings_fetcher(self, input_queue: asyncio.Queue, output_queue: asyncio.Queue, proxy: str):
-        worker_logger = WorkerLogger('item_service', proxy)
-        client = SteamPublicClient(proxy=proxy, currency=Currency.KZT)
-        
+        # Save fetch timestamps once every item of the cycle has been committed
+        await self.persistence_service.call(self.db_repository.save_fetch_timestamps, self._fetch_start, fetch_end)
+
+        if self.parse_pool is None:
+            # Parse processes keep their own caches; only the in-loop one is visible here
+            info = resolve_gems.cache_info()
+            self.logger.info(
+                f"Gem parse cache: {gem_cache_hit_rate():.1%} hit rate over {info.hits + info.misses} lookups, "
+                f"{info.currsize}/{info.maxsize} entries"
+            )
+
+        if self.evaluator is not None:
+            # Let streamed evaluations and the purchases they started settle before reconciliation
+            await self.evaluator.finish_cycle()
+
+    async def _process_task(self, task: dict, lane: WorkLane, worker: ProxyWorker):
+        worker_logger = WorkerLogger('item_service', worker.proxy, task['item'])
         try:
-            while True:
-                item = await input_queue.get()
-                if item is None:
-                    break
-                    
-                worker_logger.set_item(item)
-                # Added retry mechanism similar to gem_service for proxy failures
-                retries = 0
-                max_retries = 3
-                success = False
-                while retries < max_retries and not success:
-                    try:
-                        # Add delay between requests
-                        await asyncio.sleep(1)
-                        
-                        worker_logger.info(f"Fetching total listings for item: {item}")
-                        total_count = await self._fetch_total_listings(client, item)
-                        worker_logger.info(f"Found {total_count} total listings")
-                        
-                        if total_count > 0:
-                            # Split into batches of 100 (matching test.py)
-                            for start in range(0, total_count, 100):
-                                batch = {
-                                    'item': item,
-                                    'start': start,
-                                    'count': min(100, total_count - start)
-                                }
-                                await output_queue.put(batch)
-                        # Mark as successful even if total_count is 0 (could be a valid result)
-                        success = True
-                    except Exception as e:
-                        retries += 1
-                        worker_logger.error(f"Error fetching total listings for item: {item} on attempt {retries}: {e}", exc_info=True)
-                        if retries < max_retries:
-                            backoff = (2 ** (retries - 1)) * 2  # exponential backoff
-                            worker_logger.info(f"Waiting {backoff}s before retrying item: {item}")
-                            await asyncio.sleep(backoff)
-                        else:
-                            worker_logger.error(f"Max retries reached for item: {item}, requeuing task.")
-                            # Requeue the task for other proxies
-                            await input_queue.put(item)
-                    finally:
-                        # This line remains untouched: mark the original task as done
-                        input_queue.task_done()
-                        
+            if task['type'] == 'total':
+                await self._process_total_task(lane, worker, worker_logger, task)
+            else:
+                await self._process_batch_task(lane, worker, worker_logger, task)
         except Exception as e:
-            worker_logger.error(f"Total listings fetcher encountered an error: {e}", exc_info=True)
-            
-        finally:
-            await client.session.close()
-            worker_logger.info("Total listings fetcher finished")
-            
-    async def _item_processor(self, listings_queue: asyncio.Queue, proxy: str):
-        worker_logger = WorkerLogger('item_service', proxy)
-        client = SteamPublicClient(proxy=proxy, currency=Currency.KZT)
-        listings_processed = 0
+            worker_logger.error(f"Error processing {task['type']} task: {e}", exc_info=True)
 
-        try:
-            while True:
-                batch = await listings_queue.get()
-                if batch is None:
-                    break
+    async def _process_total_task(self, lane: WorkLane, worker: ProxyWorker, worker_logger: WorkerLogger, task: dict):
+        item = task['item']
+        # Added retry mechanism similar to gem_service for proxy failures
+        max_retries = 3
+        for retries in range(1, max_retries + 1):
+            try:
+                worker_logger.info(f"Fetching total listings for item: {item}")
+                first_page, total_count = await self._fetch_total_listings(worker.client, worker.limiter, item)
+                worker_logger.info(f"Found {total_count} total listings")
+                
+                # The count request already returned the first page; process it
+                # here and only queue batches for the pages after it
+                page_size = settings.LISTINGS_PER_REQUEST
+                if first_page:
+                    await self._process_listings(first_page, worker_logger)
+                for start in range(page_size, total_count, page_size):
+                    batch = {
+                        'type': 'batch',
+                        'item': item,
+                        'start': start,
+                        'count': min(page_size, total_count - start)
+                    }
+                    lane.put(batch, _BATCH_PRIORITY)
+                # Successful even if total_count is 0 (could be a valid result)
+                return
+            except Exception as e:
+                worker_logger.error(f"Error fetching total listings for item: {item} on attempt {retries}: {e}", exc_info=True)
+                if retries < max_retries:
+                    backoff = (2 ** (retries - 1)) * 2  # exponential backoff
+                    worker_logger.info(f"Waiting {backoff}s before retrying item: {item}")
+                    await asyncio.sleep(backoff)
 
-                worker_logger.set_item(batch['item'])
-                # Added retry mechanism similar to gem_service for proxy failures in processing a batch
-                retries = 0
-                max_retries = 3
-                success = False
-                df = None
-                while retries < max_retries and not success:
-                    try:
-                        listings = await self._fetch_listings_for_item_range(client, batch['item'], batch['start'])
-                        # Process listings using the existing parser
-                        df, parsed_ids = parse_market_listings(listings)
-                        success = True
-                    except Exception as e:
-                        retries += 1
-                        worker_logger.error(f"Error fetching listings for item '{batch['item']}' at start {batch['start']} on attempt {retries}: {e}", exc_info=True)
-                        if retries < max_retries:
-                            backoff = (2 ** (retries - 1)) * 2  # exponential backoff
-                            worker_logger.info(f"Waiting {backoff}s before retrying batch for item: {batch['item']}")
-                            await asyncio.sleep(backoff)
-                        else:
-                            worker_logger.error(f"Max retries reached for batch of item: {batch['item']}, requeuing batch.")
-                            # Requeue the failed batch for other proxy workers to try
-                            await listings_queue.put(batch)
-                            break
+        worker_logger.error(f"Max retries reached for item: {item}, requeuing task.")
+        # Requeue the task for other proxies
+        lane.put(task, _TOTAL_PRIORITY)
 
-                if not success:
-                    listings_queue.task_done()
-                    continue
+    async def _process_batch_task(self, lane: WorkLane, worker: ProxyWorker, worker_logger: WorkerLogger, batch: dict) -> int:
+        """Fetch, parse and persist one batch. Returns the number of listings it covered."""
+        # Added retry mechanism similar to gem_service for proxy failures in processing a batch
+        max_retries = 3
+        for retries in range(1, max_retries + 1):
+            try:
+                listings = await self._fetch_listings_for_item_range(worker.client, worker.limiter, batch['item'], batch['start'])
+                break
+            except Exception as e:
+                worker_logger.error(f"Error fetching listings for item '{batch['item']}' at start {batch['start']} on attempt {retries}: {e}", exc_info=True)
+                if retries < max_retries:
+                    backoff = (2 ** (retries - 1)) * 2  # exponential backoff
+                    worker_logger.info(f"Waiting {backoff}s before retrying batch for item: {batch['item']}")
+                    await asyncio.sleep(backoff)
+        else:
+            worker_logger.error(f"Max retries reached for batch of item: {batch['item']}, requeuing batch.")
+            # Requeue the failed batch for other proxy workers to try
+            lane.put(batch, _BATCH_PRIORITY)
+            return 0
 
-                try:
-                    if not df.empty:
-                        worker_logger.info(f"Found {len(df)} items with gems")
-                        for _, row in df.iterrows():
-                            try:
-                                current_time = datetime.now().timestamp()
-                                worker_logger.debug(f"Raw row data: {row.to_dict()}")
+        await self._process_listings(listings, worker_logger)
+        return batch['count']
 
-                                ethereal_gem = str(row["Ethereal Gem"]) if pd.notna(row["Ethereal Gem"]) else None
-                                prismatic_gem = str(row["Prismatic Gem"]) if pd.notna(row["Prismatic Gem"]) else None
+    async def _process_listings(self, listings: list, worker_logger: WorkerLogger) -> None:
+        """Persist a page of raw listings, parse it and queue the items that carry gems."""
+        if not listings:
+            return
 
-                                if ethereal_gem and ethereal_gem not in ALLOWED_GEMS_ETHEREAL:
-                                    worker_logger.warning(f"Invalid ethereal gem name: {ethereal_gem}")
-                                    ethereal_gem = None
-                                if prismatic_gem and prismatic_gem not in ALLOWED_GEMS_PRISMATIC:
-                                    worker_logger.warning(f"Invalid prismatic gem name: {prismatic_gem}")
-                                    prismatic_gem = None
+        unchanged = 0
+        if self.delta_scraping:
+            # Known listings with an unchanged price only get their timestamp refreshed
+            listings, unchanged_with_gems, unchanged = self.listing_index.partition(listings)
+            if unchanged:
+                worker_logger.debug("Skipping %d unchanged listings", unchanged)
+            if unchanged_with_gems:
+                await self.persistence_service.refresh_listings(unchanged_with_gems, datetime.now().timestamp())
+            if not listings:
+                return
 
-                                item = Item(
-                                    id=row["ID"],
-                                    name=row["Item Description"],
-                                    price=float(row["Price"]),
-                                    ethereal_gem=ethereal_gem,
-                                    prismatic_gem=prismatic_gem,
-                                    timestamp=current_time
-                                )
-                                self.db_repository.save_item(item)
-                            except Exception as e:
-                                worker_logger.error(f"Error saving item: {e}", exc_info=True)
-                    else:
-                        worker_logger.info("No items with gems found in this batch.")
+        # Queue the whole page of raw listings right after fetching
+        await self.persistence_service.save_raw_listings(listings, datetime.now().timestamp())
+
+        # Build items straight off the parser's record stream
+        if self.parse_pool is not None:
+            records = await self.parse_pool.parse(listings)
+        else:
+            records = iter_market_listings(listings)
+        parsed_ids = set()
+        items = []
+        for record in records:
+            parsed_ids.add(record.id)
+            try:
+                current_time = datetime.now().timestamp()
+                worker_logger.debug("Parsed record: %s", record)
 
-                    # New: Clean up raw listings that weren't successfully parsed
-                    if listings:  # Only if we have listings
-                        fetched_ids = {listing.id for listing in listings}
-                        ids_to_remove = fetched_ids - parsed_ids
-                        if ids_to_remove:
-                            worker_logger.info(f"Cleaning up {len(ids_to_remove)} unparsed raw listings")
-                            self.db_repository.remove_raw_listings(ids_to_remove)
+                ethereal_gem = record.ethereal_gem
+                prismatic_gem = record.prismatic_gem
+                if ethereal_gem and ethereal_gem not in ALLOWED_GEMS_ETHEREAL:
+                    worker_logger.warning("Invalid ethereal gem name: %s", ethereal_gem)
+                    ethereal_gem = None
+                if prismatic_gem and prismatic_gem not in ALLOWED_GEMS_PRISMATIC:
+                    worker_logger.warning("Invalid prismatic gem name: %s", prismatic_gem)
+                    prismatic_gem = None
 
-                    listings_processed += batch['count']
-                    if listings_processed >= settings.LISTINGS_BEFORE_BATCH_DELAY:
-                        worker_logger.debug(f"Sleeping for {settings.BATCH_DELAY}s after processing {listings_processed} listings")
-                        await asyncio.sleep(settings.BATCH_DELAY)
-                        listings_processed = 0
+                items.append(Item(
+                    id=record.id,
+                    name=record.item_description,
+                    price=float(record.price),
+                    ethereal_gem=ethereal_gem,
+                    prismatic_gem=prismatic_gem,
+                    timestamp=current_time
+                ))
+            except Exception as e:
+                worker_logger.error(f"Error building item: {e}", exc_info=True)
 
-                except Exception as e:
-                    worker_logger.error(f"Error processing batch: {e}", exc_info=True)
+        if parsed_ids:
+            # Hand the whole batch to the write-behind queue
+            await self.persistence_service.save_items(items)
+            if self.evaluator is not None:
+                self.evaluator.submit(items, listings)
 
-                finally:
-                    listings_queue.task_done()
+        if self.delta_scraping:
+            self.listing_index.record(listings, parsed_ids)
 
-        except Exception as e:
-            worker_logger.error(f"Worker encountered an error: {e}", exc_info=True)
+        # Clean up raw listings that weren't successfully parsed
+        fetched_ids = {listing.id for listing in listings}
+        ids_to_remove = fetched_ids - parsed_ids
+        if ids_to_remove:
+            await self.persistence_service.remove_raw_listings(ids_to_remove)
 
-        finally:
-            await client.session.close()
-            worker_logger.info("Item processor finished")
+        # One summary per page instead of a line per listing
+        worker_logger.info(
+            "Parsed %d listings: %d with gems, %d unparsed raw listings removed, %d unchanged skipped",
+            len(listings), len(items), len(ids_to_remove), unchanged,
+            fields={'listings': len(listings), 'items': len(items), 'removed': len(ids_to_remove), 'unchanged': unchanged}
+        )
         
-    async def _fetch_total_listings(self, client: SteamPublicClient, item: str) -> int:
+    async def _fetch_total_listings(self, client: SteamPublicClient, limiter: AdaptiveRateLimiter,
+                                    item: str) -> Tuple[list, int]:
+        """Return the first page of listings together with the total listing count."""
         max_retries = 3
         retry_delay = 5
         
         for attempt in range(max_retries):
             try:
-                _, total_count, _ = await client.get_item_listings(
-                    item,
-                    App.DOTA2,
-                    count=settings.LISTINGS_PER_REQUEST, #15->100
-                    start=0
-                )
+                async with limiter.request():
+                    listings, total_count, _ = await client.get_item_listings(
+                        item,
+                        App.DOTA2,
+                        count=settings.LISTINGS_PER_REQUEST, #15->100
+                        start=0
+                    )
                 
                 if total_count == 0:
                     self.logger.warning(f"Zero listings returned for '{item}'. This may indicate an API issue.")
                 else:
                     self.logger.info(f"Successfully fetched {total_count} total listings for '{item}'")
                 
-                return total_count
+                return listings, total_count
 
             except Exception as e:
                 if attempt < max_retries - 1:
@@ -238,26 +266,20 @@ class ItemService:
                     await asyncio.sleep(retry_delay * (attempt + 1))
                 else:
                     self.logger.error(f"Failed after {max_retries} attempts to fetch listings for '{item}': {e}")
-                    return 0
+                    return [], 0
 
-        return 0
+        return [], 0
         
-    async def _fetch_listings_for_item_range(self, client: SteamPublicClient, item: str, start: int):
+    async def _fetch_listings_for_item_range(self, client: SteamPublicClient, limiter: AdaptiveRateLimiter,
+                                             item: str, start: int):
         try:
-            listings, _, _ = await client.get_item_listings(
-                item,
-                App.DOTA2,
-                count=settings.LISTINGS_PER_REQUEST,
-                start=start
-            )
-            
-            # Store each raw listing right after fetching
-            current_time = datetime.now().timestamp()
-            for listing in listings:
-                try:
-                    self.db_repository.save_raw_listing(listing.id, listing, current_time)
-                except Exception as e:
-                    logging.error(f"Failed to store raw listing {listing.id}: {e}")
+            async with limiter.request():
+                listings, _, _ = await client.get_item_listings(
+                    item,
+                    App.DOTA2,
+                    count=settings.LISTINGS_PER_REQUEST,
+                    start=start
+                )
             
             return listings
         except Exception as e:
@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+from ..config.settings import settings
+from ..database.repository import DatabaseRepository
+from ..utils.parsing import listing_price
+
+class ListingIndex:
+    """
+    In-memory index of market listings seen in recent cycles, keyed by listing ID.
+
+    A listing whose ID is known and whose price has not changed carries the
+    same item and gems as before, so ItemService can skip parsing and
+    re-saving it and only refresh its timestamp. The index is seeded from the
+    items table (gem-bearing listings within the raw-listing retention window)
+    and also remembers listings without gems, which are never stored.
+    """
+    def __init__(self, db_repository: DatabaseRepository):
+        self.db_repository = db_repository
+        self.logger = logging.getLogger('listing_index')
+        self._prices: Dict[str, float] = {}
+        self._with_gems: Set[str] = set()
+        self._seen: Set[str] = set()
+        self._loaded = False
+
+    def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        since = datetime.now().timestamp() - getattr(settings, 'RAW_LISTING_RETENTION', 86400)
+        self._prices = self.db_repository.get_listing_prices(since)
+        self._with_gems = set(self._prices)
+        self._loaded = True
+        self.logger.info(f"Loaded {len(self._prices)} known listings into the listing index")
+
+    def partition(self, listings: Iterable) -> Tuple[List, List[str], int]:
+        """
+        Split a page into listings that need parsing and known, unchanged ones.
+        Returns ``(fresh_listings, unchanged_ids_with_gems, unchanged_count)``.
+        """
+        fresh = []
+        unchanged_with_gems = []
+        unchanged = 0
+        for listing in listings:
+            self._seen.add(listing.id)
+            known_price = self._prices.get(listing.id)
+            if known_price is not None and known_price == listing_price(listing):
+                unchanged += 1
+                if listing.id in self._with_gems:
+                    unchanged_with_gems.append(listing.id)
+            else:
+                fresh.append(listing)
+        return fresh, unchanged_with_gems, unchanged
+
+    def record(self, listings: Iterable, ids_with_gems: Set[str]) -> None:
+        """Remember freshly parsed listings and whether they carried gems."""
+        for listing in listings:
+            self._prices[listing.id] = listing_price(listing)
+            if listing.id in ids_with_gems:
+                self._with_gems.add(listing.id)
+            else:
+                self._with_gems.discard(listing.id)
+
+    def start_cycle(self) -> None:
+        self._seen = set()
+
+    def end_cycle(self) -> None:
+        """Forget listings that did not show up this cycle (sold or delisted)."""
+        stale = set(self._prices) - self._seen
+        for listing_id in stale:
+            del self._prices[listing_id]
+        self._with_gems -= stale
+        if stale:
+            self.logger.info(f"Dropped {len(stale)} listings no longer on the market from the listing index")
+
+    def __len__(self) -> int:
+        return len(self._prices)
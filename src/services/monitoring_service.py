@@ -1,19 +1,31 @@
 import asyncio
 import logging
-from typing import Optional
+from typing import Any, List, Sequence, Tuple
 from ..config.settings import settings
 from ..database.repository import DatabaseRepository
 from ..models.item import Item
 from ..models.gem import Gem
 from ..models.comparison import Comparison
 from ..services.alert_service import AlertService
+from .gem_cache import GemCache
+from .profit_engine import ProfitEngine
+from .purchase_executor import (
+    PurchaseExecutor, PurchaseOrder, PurchaseResult, BOUGHT, FAILED, DUPLICATE, INSUFFICIENT_FUNDS, MISSING_LISTING
+)
 from datetime import datetime
 from ..utils.steam_client import SteamMarketClient
 
 class MonitoringService:
-    def __init__(self, db_repository: DatabaseRepository, alert_service: AlertService):
+    def __init__(self, db_repository: DatabaseRepository, alert_service: AlertService, gem_cache: GemCache,
+                 steam_client: SteamMarketClient):
         self.db_repository = db_repository
+        # Long-lived purchase client, kept warm by the application
+        self.steam_client = steam_client
+        # Shared by the streaming and the batch pass, so each listing is attempted once
+        self.purchase_executor = PurchaseExecutor(steam_client, int(getattr(settings, 'PURCHASE_CONCURRENCY', 3)))
         self.alert_service = alert_service
+        self.gem_cache = gem_cache
+        self.profit_engine = ProfitEngine(gem_cache)
         self.logger = logging.getLogger('monitoring_service')
         
     async def monitor_cycle(self):
@@ -25,141 +37,111 @@ class MonitoringService:
         
         items = self.db_repository.get_items_in_timerange(fetch_start, fetch_end)
         self.logger.info(f"Retrieved {len(items)} items for comparison between {fetch_start} and {fetch_end}")
-        profitable_found = False
+        # Gems are served from memory for the whole pass
+        self.gem_cache.ensure_loaded()
         
-        for item in items:
-            comparison = await self._compare_item(item)
-            if comparison.is_profitable:
-                profitable_found = True
-                await self.alert_service.send_profit_alert(item, comparison)
+        # Evaluate the whole snapshot at once, then act on the profitable subset only
+        comparisons = self.profit_engine.evaluate(items)
+        self.db_repository.save_comparisons_bulk(comparisons)
+        
+        items_by_id = {item.id: item for item in items}
+        profitable = self.profit_engine.rank_profitable(comparisons)
+        self.logger.info(f"Evaluated {len(comparisons)} items, {len(profitable)} profitable")
+        
+        # Listings already handled by the streaming fast path are skipped
+        await self.purchase_profitable([
+            (items_by_id[comparison.item_id], comparison, None) for comparison in profitable
+        ])
                 
-        if not profitable_found:
+        # Listings that failed this cycle may be retried once they are fetched again
+        self.purchase_executor.reset_failures()
+
+        if not profitable:
             await self.alert_service.send_no_profit_alert(fetch_start, fetch_end)
         self.logger.info("Monitoring cycle completed")
         
-    async def _compare_item(self, item: Item) -> Comparison:
-        self.logger.info(f"\n=== Starting comparison for item ===")
+    def _log_item_details(self, item: Item, comparison: Comparison) -> None:
+        self.logger.info(f"\n=== Comparison for item ===")
         self.logger.info(f"Item ID: {item.id}")
         self.logger.info(f"Item Name: {item.name}")
         self.logger.info(f"Item Price: {item.price}")
-        try:
-            timestamp = float(item.timestamp)
-            self.logger.info(f"Item Timestamp: {datetime.fromtimestamp(timestamp)}")
-        except (ValueError, TypeError):
-            self.logger.error(f"Invalid timestamp format: {item.timestamp}")
-            timestamp = datetime.now().timestamp()
-        
-        # Log Ethereal Gem details
-        if item.ethereal_gem:
-            self.logger.info(f"\nEthereal Gem: {item.ethereal_gem}")
-            gem = self.db_repository.get_gem(item.ethereal_gem)
-            if gem:
-                self.logger.info(f"Ethereal Gem Last Updated: {datetime.fromtimestamp(gem.timestamp)}")
-                if gem.parsed_buy_orders:
-                    self.logger.info(f"Ethereal Gem Top 3 Buy Orders:")
-                    for i, (price, quantity) in enumerate(gem.parsed_buy_orders[:3]):
-                        self.logger.info(f"  {i+1}. Price: {price:.2f}, Quantity: {quantity}")
-            else:
-                self.logger.warning(f"Ethereal Gem not found in database")
+        self.logger.info(f"Item Timestamp: {datetime.fromtimestamp(comparison.timestamp)}")
         
-        # Log Prismatic Gem details
-        if item.prismatic_gem:
-            self.logger.info(f"\nPrismatic Gem: {item.prismatic_gem}")
-            gem = self.db_repository.get_gem(item.prismatic_gem)
+        for label, gem_name in (("Ethereal", item.ethereal_gem), ("Prismatic", item.prismatic_gem)):
+            if not gem_name:
+                continue
+            self.logger.info(f"\n{label} Gem: {gem_name}")
+            gem = self.gem_cache.get(gem_name)
             if gem:
-                self.logger.info(f"Prismatic Gem Last Updated: {datetime.fromtimestamp(gem.timestamp)}")
+                self.logger.info(f"{label} Gem Last Updated: {datetime.fromtimestamp(gem.timestamp)}")
                 if gem.parsed_buy_orders:
-                    self.logger.info(f"Prismatic Gem Top 3 Buy Orders:")
+                    self.logger.info(f"{label} Gem Top 3 Buy Orders:")
                     for i, (price, quantity) in enumerate(gem.parsed_buy_orders[:3]):
                         self.logger.info(f"  {i+1}. Price: {price:.2f}, Quantity: {quantity}")
             else:
-                self.logger.warning(f"Prismatic Gem not found in database")
-        
-        # Get gem prices and calculate profit
-        prismatic_gem_price = await self._get_gem_price(item.prismatic_gem)
-        ethereal_gem_price = await self._get_gem_price(item.ethereal_gem)
-        
-        combined_gem_price = 0.0
-        if prismatic_gem_price is not None:
-            combined_gem_price += prismatic_gem_price
-        if ethereal_gem_price is not None:
-            combined_gem_price += ethereal_gem_price
-            
-        expected_profit = combined_gem_price * (1 - settings.STEAM_FEE) - item.price
-        is_profitable = expected_profit >= settings.TARGET_PROFIT
+                self.logger.warning(f"{label} Gem not found in database")
         
-        comparison = Comparison(
-            item_id=item.id,
-            item_price=item.price,
-            is_profitable=is_profitable,
-            timestamp=timestamp,
-            prismatic_gem_price=prismatic_gem_price,
-            ethereal_gem_price=ethereal_gem_price,
-            combined_gem_price=combined_gem_price,
-            expected_profit=expected_profit
+        self.logger.info(
+            f"Expected Profit = {comparison.expected_profit:.2f}, Is Profitable = {comparison.is_profitable}"
         )
-        self.db_repository.save_comparison(comparison)
-        self.logger.debug(
-            f"Compared item {item.id}: Expected Profit = {expected_profit:.2f}, Is Profitable = {is_profitable}"
-        )
-        
-        if comparison.is_profitable:
-            await self.buy_profitable_item(comparison)
-        
-        return comparison
 
-    async def _get_gem_price(self, gem_name: Optional[str]) -> Optional[float]:
-        if not gem_name:
-            return None
-        
-        gem = self.db_repository.get_gem(gem_name)
-        if not gem:
-            self.logger.warning(f"Gem '{gem_name}' not found in database")
-            return None
-        
-        buy_orders = gem.parsed_buy_orders
-        if not buy_orders:
-            self.logger.warning(f"No buy orders found for gem '{gem_name}'")
-            return None
-        
-        return buy_orders[0][0]
+    async def purchase_profitable(self, candidates: Sequence[Tuple[Item, Comparison, Any]]) -> List[PurchaseResult]:
+        """
+        Buy profitable listings through the purchase executor and report each
+        outcome. ``candidates`` are (item, comparison, raw listing) triples; a
+        missing raw listing is loaded from the database.
+        """
+        orders = []
+        for item, comparison, raw_listing in candidates:
+            if self.purchase_executor.was_attempted(comparison.item_id):
+                continue
+            self._log_item_details(item, comparison)
+            # Get the raw listing from database unless the caller already holds it
+            if raw_listing is None:
+                raw_listing = self.db_repository.get_raw_listing(comparison.item_id)
+            orders.append(PurchaseOrder(item, comparison, raw_listing))
+        if not orders:
+            return []
 
-    async def buy_profitable_item(self, comparison: Comparison) -> bool:
-        self.logger.info(f"Attempting to buy profitable item {comparison.item_id}")
-        
-        # Get the raw listing from database
-        raw_listing = self.db_repository.get_raw_listing(comparison.item_id)
-        if not raw_listing:
-            self.logger.error(f"Raw listing not found for item {comparison.item_id}")
-            return False
-        
         try:
-            # Initialize Steam client
-            steam_client = SteamMarketClient()
-            await steam_client.initialize()
-            
-            # Attempt to buy the listing
-            wallet_info = await steam_client.buy_listing(raw_listing)
-            
+            # No-op unless the background warm-up has not completed yet
+            await self.steam_client.ensure_ready()
+        except Exception as e:
+            # Nothing is claimed yet, so these listings stay eligible for a later pass
+            self.logger.error(f"Purchase client is not ready, skipping {len(orders)} purchases: {e}")
+            return []
+
+        results = await self.purchase_executor.execute(orders)
+        for result in results:
+            await self._report_purchase(result)
+        return results
+
+    async def _report_purchase(self, result: PurchaseResult) -> None:
+        item, comparison = result.order.item, result.order.comparison
+        if result.status == DUPLICATE:
+            return
+        if result.status == BOUGHT:
             # Log success and notify
-            self.logger.info(f"Successfully bought item {comparison.item_id}. Wallet info: {wallet_info}")
+            self.logger.info(f"Successfully bought item {comparison.item_id}. Wallet info: {result.wallet_info}")
             await self.alert_service.send_message(
                 f"🎉 Successfully bought profitable item!\n"
-                f"Item: {raw_listing.item.description.market_name}\n"
+                f"Item: {result.order.raw_listing.item.description.market_name}\n"
                 f"Price: {comparison.item_price}\n"
                 f"Expected Profit: {comparison.expected_profit}"
             )
-            return True
-        
-        except Exception as e:
-            self.logger.error(f"Failed to buy item {comparison.item_id}: {e}")
+        elif result.status == FAILED:
+            self.logger.error(f"Failed to buy item {comparison.item_id}: {result.error}")
             await self.alert_service.send_message(
                 f"❌ Failed to buy profitable item!\n"
                 f"Item: {comparison.item_id}\n"
-                f"Error: {str(e)}"
+                f"Error: {str(result.error)}"
             )
-            return False
-        
-        finally:
-            if steam_client:
-                await steam_client.close()
+        elif result.status == INSUFFICIENT_FUNDS:
+            await self.alert_service.send_message(
+                f"⚠️ Skipped profitable item, insufficient wallet balance!\n"
+                f"Item: {comparison.item_id}\n"
+                f"Price: {comparison.item_price}"
+            )
+        elif result.status == MISSING_LISTING:
+            self.logger.error(f"Raw listing not found for item {comparison.item_id}")
+        await self.alert_service.send_profit_alert(item, comparison)
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from ..config.settings import settings
+from ..database.repository import DatabaseRepository
+from ..models.item import Item
+from ..models.gem import Gem
+
+class _PendingWrites:
+    """Coalesced writes waiting for the next flush. Later writes to the same key win."""
+    def __init__(self):
+        self.items: Dict[str, Item] = {}
+        self.gems: Dict[str, Gem] = {}
+        self.raw_listings: Dict[str, Tuple[Any, float]] = {}
+        self.removed_raw_listings: Set[str] = set()
+        self.refreshed_listings: Dict[str, float] = {}
+        self.first_write: Optional[float] = None
+        # Consecutive flushes that failed to commit this batch
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return (len(self.items) + len(self.gems) + len(self.raw_listings)
+                + len(self.removed_raw_listings) + len(self.refreshed_listings))
+
+class PersistenceService:
+    """
+    Write-behind queue between the async workers and the DatabaseRepository.
+
+    Workers enqueue writes on a bounded asyncio.Queue and return immediately;
+    a background task coalesces them and flushes them in bulk on a dedicated
+    writer thread once ``PERSISTENCE_FLUSH_SIZE`` writes are pending or
+    ``PERSISTENCE_FLUSH_INTERVAL`` seconds have passed. When the queue is full
+    the ``save_*`` coroutines wait, which throttles the producers.
+
+    A flush commits in one transaction and every write is idempotent, so a
+    batch that fails to commit (e.g. with ``database is locked``) is retried
+    with backoff and, failing that, kept and merged with later writes for the
+    next flush. ``flush`` raises if its batch could not be committed.
+    """
+    def __init__(self, db_repository: DatabaseRepository):
+        self.db_repository = db_repository
+        self.logger = logging.getLogger('persistence_service')
+        self.max_pending = int(getattr(settings, 'PERSISTENCE_QUEUE_SIZE', 10000))
+        self.flush_size = int(getattr(settings, 'PERSISTENCE_FLUSH_SIZE', 500))
+        self.flush_interval = float(getattr(settings, 'PERSISTENCE_FLUSH_INTERVAL', 1.0))
+        self.flush_retries = int(getattr(settings, 'PERSISTENCE_FLUSH_RETRIES', 3))
+        self.retry_delay = float(getattr(settings, 'PERSISTENCE_RETRY_DELAY', 0.5))
+        # Failed flushes after which a batch is given up, so one bad write cannot stall persistence for good
+        self.max_failed_flushes = int(getattr(settings, 'PERSISTENCE_MAX_FAILED_FLUSHES', 5))
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._task = asyncio.create_task(self._run())
+        self.logger.info("Persistence writer started")
+
+    async def close(self) -> None:
+        """Drain every pending write, then stop the writer task and thread."""
+        if self._task is None:
+            return
+        try:
+            await self.flush()
+        finally:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._executor.shutdown(wait=True)
+            self._task = None
+            self._queue = None
+            self._executor = None
+            self.logger.info("Persistence writer stopped")
+
+    @property
+    def backlog(self) -> int:
+        """Number of writes queued but not yet picked up by the writer."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def save_item(self, item: Item) -> None:
+        await self._put('item', item)
+
+    async def save_items(self, items: Iterable[Item]) -> None:
+        for item in items:
+            await self._put('item', item)
+
+    async def save_gem(self, gem: Gem) -> None:
+        await self._put('gem', gem)
+
+    async def save_raw_listings(self, listings: Iterable[Any], timestamp: float) -> None:
+        for listing in listings:
+            await self._put('raw_listing', (listing, timestamp))
+
+    async def remove_raw_listings(self, listing_ids: Iterable[str]) -> None:
+        for listing_id in listing_ids:
+            await self._put('remove_raw_listing', listing_id)
+
+    async def refresh_listings(self, listing_ids: Iterable[str], timestamp: float) -> None:
+        """Bump the timestamp of known, unchanged listings without rewriting them."""
+        for listing_id in listing_ids:
+            await self._put('refresh_listing', (listing_id, timestamp))
+
+    async def flush(self) -> None:
+        """Wait until every write enqueued so far has been committed."""
+        if self._queue is None:
+            return
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(('flush', future))
+        await future
+
+    async def call(self, fn: Callable, *args) -> Any:
+        """Run a repository call on the writer thread, after all pending writes."""
+        await self.flush()
+        if self._executor is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _put(self, kind: str, payload: Any) -> None:
+        if self._queue is None:
+            raise RuntimeError("PersistenceService is not started")
+        await self._queue.put((kind, payload))
+
+    async def _run(self) -> None:
+        pending = _PendingWrites()
+        while True:
+            timeout = None
+            if pending.first_write is not None:
+                timeout = max(0.0, pending.first_write + self.flush_interval - time.monotonic())
+            try:
+                kind, payload = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                pending, _ = await self._flush(pending)
+                continue
+
+            try:
+                if kind == 'flush':
+                    pending, error = await self._flush(pending)
+                    if not payload.done():
+                        if error is None:
+                            payload.set_result(None)
+                        else:
+                            payload.set_exception(error)
+                    continue
+
+                if pending.first_write is None:
+                    pending.first_write = time.monotonic()
+                if kind == 'item':
+                    pending.items[payload.id] = payload
+                elif kind == 'gem':
+                    pending.gems[payload.name] = payload
+                elif kind == 'raw_listing':
+                    listing, _ = payload
+                    pending.raw_listings[listing.id] = payload
+                    pending.removed_raw_listings.discard(listing.id)
+                elif kind == 'refresh_listing':
+                    listing_id, timestamp = payload
+                    pending.refreshed_listings[listing_id] = timestamp
+                elif kind == 'remove_raw_listing':
+                    pending.raw_listings.pop(payload, None)
+                    pending.removed_raw_listings.add(payload)
+
+                if len(pending) >= self.flush_size and not pending.failed_flushes:
+                    pending, _ = await self._flush(pending)
+            finally:
+                self._queue.task_done()
+
+    async def _flush(self, pending: _PendingWrites) -> Tuple[_PendingWrites, Optional[Exception]]:
+        """
+        Commit ``pending``. Returns the batch to keep collecting into (a fresh
+        one once committed) and the error if the writes could not be committed.
+        """
+        if not len(pending):
+            return pending, None
+        for attempt in range(self.flush_retries + 1):
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._write, pending)
+                return _PendingWrites(), None
+            except Exception as e:
+                error = e
+                if attempt < self.flush_retries:
+                    delay = self.retry_delay * 2 ** attempt
+                    self.logger.warning(f"Failed to flush {len(pending)} pending writes ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+        pending.failed_flushes += 1
+        if pending.failed_flushes >= self.max_failed_flushes:
+            self.logger.error(
+                f"Dropping {len(pending)} pending writes after {pending.failed_flushes} failed flushes: {error}",
+                exc_info=error
+            )
+            return _PendingWrites(), error
+        self.logger.error(f"Failed to flush {len(pending)} pending writes, keeping them for the next flush: {error}",
+                          exc_info=error)
+        # Wait a full interval before the next attempt
+        pending.first_write = time.monotonic()
+        return pending, error
+
+    def _write(self, pending: _PendingWrites) -> None:
+        started = time.monotonic()
+        # One transaction per flush: items never land without their raw listings
+        with self.db_repository.write_connection():
+            self.db_repository.save_items_bulk(pending.items.values())
+            self.db_repository.save_gems_bulk(pending.gems.values())
+
+            # Raw listings of one page share a fetch timestamp
+            by_timestamp: Dict[float, list] = {}
+            for listing, timestamp in pending.raw_listings.values():
+                by_timestamp.setdefault(timestamp, []).append(listing)
+            for timestamp, listings in by_timestamp.items():
+                self.db_repository.save_raw_listings_bulk(listings, timestamp)
+
+            self.db_repository.remove_raw_listings(pending.removed_raw_listings)
+
+            refreshed_by_timestamp: Dict[float, list] = {}
+            for listing_id, timestamp in pending.refreshed_listings.items():
+                refreshed_by_timestamp.setdefault(timestamp, []).append(listing_id)
+            for timestamp, listing_ids in refreshed_by_timestamp.items():
+                self.db_repository.refresh_listing_timestamps(listing_ids, timestamp)
+        self.logger.debug(f"Flushed {len(pending)} writes in {time.monotonic() - started:.3f}s")
@@ -0,0 +1,130 @@
+import logging
+from datetime import datetime
+from typing import List, Optional, Sequence
+import numpy as np
+from ..config.settings import settings
+from ..models.item import Item
+from ..models.comparison import Comparison
+from .gem_cache import GemCache
+from .gem_valuation import GemAllocation
+
+class ProfitEngine:
+    """
+    Evaluates the expected profit of a whole item snapshot in one vectorized pass.
+
+    Item prices and the top buy order of each item's gems are laid out as
+    NumPy columns, so the cost of a cycle is a handful of array operations
+    plus building the Comparison records, independent of per-item DB or
+    Python arithmetic.
+
+    With ``DEPTH_AWARE_VALUATION`` enabled (the default), items that are
+    profitable at the top of the book are then re-priced best-first against
+    the full buy-order ladders: every unit of a gem committed to an earlier
+    item pushes the next one further down the book.
+    """
+    def __init__(self, gem_cache: GemCache):
+        self.gem_cache = gem_cache
+        self.logger = logging.getLogger('profit_engine')
+
+    def evaluate(self, items: Sequence[Item], allocation: Optional[GemAllocation] = None) -> List[Comparison]:
+        """
+        Return one Comparison per item, in the same order as ``items``. Passing
+        an ``allocation`` carries committed gem units over from earlier calls.
+        """
+        if not items:
+            return []
+
+        # One top-of-book lookup per distinct gem, then a column per gem slot
+        top_prices = {}
+        for item in items:
+            for gem_name in (item.prismatic_gem, item.ethereal_gem):
+                if gem_name and gem_name not in top_prices:
+                    top_prices[gem_name] = self.gem_cache.top_buy_price(gem_name)
+
+        def gem_column(names):
+            return np.array(
+                [top_prices.get(name) if name else None for name in names],
+                dtype=np.float64
+            )
+
+        prices = np.fromiter((item.price for item in items), dtype=np.float64, count=len(items))
+        prismatic = gem_column([item.prismatic_gem for item in items])
+        ethereal = gem_column([item.ethereal_gem for item in items])
+
+        combined = np.nan_to_num(prismatic) + np.nan_to_num(ethereal)
+        expected_profit = combined * (1 - settings.STEAM_FEE) - prices
+        is_profitable = expected_profit >= settings.TARGET_PROFIT
+
+        now = datetime.now().timestamp()
+        comparisons = []
+        for i, item in enumerate(items):
+            try:
+                timestamp = float(item.timestamp)
+            except (ValueError, TypeError):
+                self.logger.error(f"Invalid timestamp format for item {item.id}: {item.timestamp}")
+                timestamp = now
+            comparisons.append(Comparison(
+                item_id=item.id,
+                item_price=item.price,
+                is_profitable=bool(is_profitable[i]),
+                timestamp=timestamp,
+                prismatic_gem_price=None if np.isnan(prismatic[i]) else float(prismatic[i]),
+                ethereal_gem_price=None if np.isnan(ethereal[i]) else float(ethereal[i]),
+                combined_gem_price=float(combined[i]),
+                expected_profit=float(expected_profit[i])
+            ))
+        if getattr(settings, 'DEPTH_AWARE_VALUATION', True):
+            self._apply_depth(items, comparisons, allocation)
+        return comparisons
+
+    def _apply_depth(self, items: Sequence[Item], comparisons: List[Comparison],
+                     allocation: Optional[GemAllocation] = None) -> None:
+        # Top-of-book is an upper bound, so only items profitable there can stay profitable
+        candidates = sorted(
+            (i for i, comparison in enumerate(comparisons) if comparison.is_profitable),
+            key=lambda i: comparisons[i].expected_profit,
+            reverse=True
+        )
+        if not candidates:
+            return
+
+        if allocation is None:
+            allocation = GemAllocation({})
+        # Re-read the ladders on every pass: an allocation can span a whole fetch cycle while
+        # GemService updates gems, and the cache rebuilds a gem's ladder when its entry changes
+        ladders = allocation.ladders
+        gem_names = {gem_name for i in candidates for gem_name in (items[i].prismatic_gem, items[i].ethereal_gem) if gem_name}
+        for gem_name in gem_names:
+            ladder = self.gem_cache.ladder(gem_name)
+            if ladder is not None:
+                ladders[gem_name] = ladder
+            else:
+                ladders.pop(gem_name, None)
+
+        for i in candidates:
+            item, comparison = items[i], comparisons[i]
+            prismatic_price = allocation.next_unit_price(item.prismatic_gem)
+            ethereal_price = allocation.next_unit_price(item.ethereal_gem)
+            combined = (prismatic_price or 0.0) + (ethereal_price or 0.0)
+            expected_profit = combined * (1 - settings.STEAM_FEE) - item.price
+
+            comparison.prismatic_gem_price = prismatic_price
+            comparison.ethereal_gem_price = ethereal_price
+            comparison.combined_gem_price = combined
+            comparison.expected_profit = expected_profit
+            comparison.is_profitable = expected_profit >= settings.TARGET_PROFIT
+            if comparison.is_profitable:
+                allocation.allocate(item.prismatic_gem)
+                allocation.allocate(item.ethereal_gem)
+
+        if allocation.allocated:
+            self.logger.info(f"Depth-aware allocation of gem units: {allocation.allocated}")
+
+    @staticmethod
+    def rank_profitable(comparisons: Sequence[Comparison]) -> List[Comparison]:
+        """Profitable comparisons, best expected profit first."""
+        return sorted(
+            (comparison for comparison in comparisons if comparison.is_profitable),
+            key=lambda comparison: comparison.expected_profit,
+            reverse=True
+        )
@@ -1,36 +1,68 @@
 import asyncio
+import dataclasses
 import logging
 import math
-import random
-from typing import List, Tuple
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
 from proxy_api import ProxyAPI  # type: ignore
 from ..config.settings import settings
+from ..models.proxy_health import ProxyHealth
+
+# Weight of the newest sample in the latency moving average
+_LATENCY_ALPHA = 0.2
+# Assumed latency, in seconds, of a proxy without a successful request yet
+_DEFAULT_LATENCY = 1.0
+
+def proxy_key(proxy: str) -> str:
+    """Stable, credential-free key for a proxy URL (``host:port``)."""
+    parts = urlsplit(proxy)
+    return f"{parts.hostname}:{parts.port}" if parts.hostname else proxy
 
 class ProxyService:
+    """
+    Acquires proxies from the ProxyAPI and keeps per-proxy health statistics
+    across cycles. Request outcomes are reported by the rate limiters; proxies
+    that fail ``PROXY_QUARANTINE_FAILURES`` times in a row are quarantined for
+    ``PROXY_QUARANTINE_SECONDS`` (doubling on every repeat, capped at
+    ``PROXY_QUARANTINE_MAX_SECONDS``), and the rest are handed out best score first.
+    """
     def __init__(self):
         self.proxy_api = ProxyAPI(settings.API_KEY)
         self.current_proxy_ids = []
+        self.logger = logging.getLogger('proxy_service')
+        self.health: Dict[str, ProxyHealth] = {}
+        self.quarantine_failures = int(getattr(settings, 'PROXY_QUARANTINE_FAILURES', 5))
+        self.quarantine_seconds = float(getattr(settings, 'PROXY_QUARANTINE_SECONDS', 600))
+        self.quarantine_max_seconds = float(getattr(settings, 'PROXY_QUARANTINE_MAX_SECONDS', 3600))
+        self.api_timeout = float(getattr(settings, 'PROXY_API_TIMEOUT', 30.0))
+        self._release_task: Optional[asyncio.Task] = None
 
     async def get_proxies(self) -> List[str]:
         max_wait_time = 3600  # 1 hour maximum wait
         initial_wait = 30  # Start with 30 seconds
         current_wait = initial_wait
 
+        # Proxies released at the end of the previous cycle must be back in the pool first
+        await self.wait_for_release()
+
         while True:
             try:
-                proxy_data = self.proxy_api.get_all_available_proxies()
+                proxy_data = await self._call_api(self.proxy_api.get_all_available_proxies)
                 if proxy_data:
-                    proxy_strings = []
-                    self.current_proxy_ids = []
+                    fetched = [(self._format_proxy(proxy), proxy['id']) for proxy in proxy_data]
+                    ranked = self._rank_proxies([proxy for proxy, _ in fetched])
 
-                    for proxy in proxy_data:
-                        formatted_proxy = self._format_proxy(proxy)
-                        proxy_strings.append(formatted_proxy)
-                        self.current_proxy_ids.append(proxy['id'])
+                    # Only proxies handed out stay locked; skipped (quarantined) ones go straight back
+                    handed_out = set(ranked)
+                    self.current_proxy_ids = [proxy_id for proxy, proxy_id in fetched if proxy in handed_out]
+                    skipped_ids = [proxy_id for proxy, proxy_id in fetched if proxy not in handed_out]
+                    if skipped_ids:
+                        self._start_release(skipped_ids)
 
                     # Reset wait time on successful proxy fetch
                     current_wait = initial_wait
-                    return proxy_strings
+                    return ranked
 
                 # No proxies available
                 logging.warning(f"No available proxies. Waiting {current_wait} seconds.")
@@ -44,6 +76,72 @@ class ProxyService:
                 await asyncio.sleep(current_wait)
                 current_wait = min(current_wait * 2, max_wait_time)
 
+    def _rank_proxies(self, proxies: List[str]) -> List[str]:
+        """Drop quarantined proxies and order the rest by descending score."""
+        healthy = [proxy for proxy in proxies if not self.is_quarantined(proxy)]
+        if not healthy:
+            # Never stall the cycle: fall back to the proxies released soonest
+            self.logger.warning(f"All {len(proxies)} proxies are quarantined, using them anyway")
+            healthy = sorted(proxies, key=lambda proxy: self._health(proxy).quarantined_until)
+        elif len(healthy) < len(proxies):
+            self.logger.info(f"Skipping {len(proxies) - len(healthy)} quarantined proxies")
+        return sorted(healthy, key=self.score, reverse=True)
+
+    def _health(self, proxy: str) -> ProxyHealth:
+        key = proxy_key(proxy)
+        health = self.health.get(key)
+        if health is None:
+            health = self.health[key] = ProxyHealth(key)
+        return health
+
+    def score(self, proxy: str) -> float:
+        """Higher is better: success rate, penalized by bans and slow responses."""
+        # Untracked proxies go through the same formula as tracked ones without samples
+        health = self.health.get(proxy_key(proxy)) or ProxyHealth(proxy_key(proxy))
+        latency = health.latency if health.latency is not None else _DEFAULT_LATENCY
+        return health.success_rate * (1 - 0.5 * health.throttle_rate) / (1 + latency)
+
+    def is_quarantined(self, proxy: str) -> bool:
+        health = self.health.get(proxy_key(proxy))
+        return health is not None and health.quarantined_until > time.time()
+
+    def record_success(self, proxy: str, latency: float) -> None:
+        health = self._health(proxy)
+        health.requests += 1
+        health.successes += 1
+        health.consecutive_failures = 0
+        if health.latency is None:
+            health.latency = latency
+        else:
+            health.latency += _LATENCY_ALPHA * (latency - health.latency)
+        health.timestamp = time.time()
+
+    def record_failure(self, proxy: str, throttled: bool = False) -> None:
+        health = self._health(proxy)
+        health.requests += 1
+        health.failures += 1
+        if throttled:
+            health.throttles += 1
+        health.consecutive_failures += 1
+        health.timestamp = time.time()
+        if health.consecutive_failures >= self.quarantine_failures and health.quarantined_until <= health.timestamp:
+            health.quarantine_count += 1
+            duration = min(self.quarantine_max_seconds, self.quarantine_seconds * 2 ** (health.quarantine_count - 1))
+            health.quarantined_until = health.timestamp + duration
+            health.consecutive_failures = 0
+            self.logger.warning(f"Quarantining proxy {health.proxy} for {duration:.0f}s "
+                                f"after {self.quarantine_failures} consecutive failures")
+
+    def load_health(self, stats: Iterable[ProxyHealth]) -> None:
+        """Restore statistics persisted by a previous run."""
+        for health in stats:
+            self.health[health.proxy] = health
+        self.logger.info(f"Loaded health statistics for {len(self.health)} proxies")
+
+    def health_snapshot(self) -> List[ProxyHealth]:
+        """Copies of the current statistics, safe to hand to the writer thread."""
+        return [dataclasses.replace(health) for health in self.health.values()]
+
     def _format_proxy(self, proxy: dict) -> str:
         """Format proxy dictionary into URL string."""
         if proxy.get('username') and proxy.get('password'):
@@ -51,20 +149,65 @@ class ProxyService:
         return f"{proxy['protocol']}://{proxy['ip']}:{proxy['port']}"
 
     def distribute_proxies(self, proxies: List[str]) -> Tuple[List[str], List[str]]:
-        random.shuffle(proxies)  # Randomize proxies before distribution
-        total_proxies = len(proxies)
-        gem_proxy_count = math.ceil(total_proxies * settings.GEM_PROXY_RATIO)
-        gem_proxies = proxies[:gem_proxy_count]
-        item_proxies = proxies[gem_proxy_count:]
+        """
+        Split ranked proxies between the gem and item services by
+        ``GEM_PROXY_RATIO``, interleaved so both get their share of the best
+        proxies and keep them first.
+        """
+        gem_proxies, item_proxies = [], []
+        for i, proxy in enumerate(proxies):
+            # ceil((i + 1) * ratio) reaches ceil(len(proxies) * ratio) at the last proxy
+            if len(gem_proxies) < math.ceil((i + 1) * settings.GEM_PROXY_RATIO):
+                gem_proxies.append(proxy)
+            else:
+                item_proxies.append(proxy)
         return gem_proxies, item_proxies
 
+    async def _call_api(self, fn: Callable, *args):
+        """Run a blocking ProxyAPI call on the default executor, bounded by ``PROXY_API_TIMEOUT``."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(None, fn, *args), self.api_timeout)
+
     async def unlock_proxies(self, proxy_ids):
-        self.proxy_api.unlock_proxies(proxy_ids)
+        await self._call_api(self.proxy_api.unlock_proxies, proxy_ids)
+
+    def release_proxies(self) -> None:
+        """
+        Start unlocking the current proxies in the background and return
+        immediately, so the unlock overlaps with whatever runs next.
+        ``get_proxies`` and ``cleanup_proxies`` wait for it to finish.
+        """
+        if not self.current_proxy_ids:
+            return
+        proxy_ids, self.current_proxy_ids = self.current_proxy_ids, []
+        self._start_release(proxy_ids)
+
+    def _start_release(self, proxy_ids) -> None:
+        # Chained after any unlock still in flight, so ``wait_for_release`` covers both
+        previous = self._release_task
+        self._release_task = asyncio.create_task(self._release(proxy_ids, previous))
+
+    async def _release(self, proxy_ids, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await self.unlock_proxies(proxy_ids)
+            logging.info(f"Unlocked proxies: {proxy_ids}")
+        except Exception as e:
+            logging.error(f"Error unlocking proxies {proxy_ids}: {e!r}")
+
+    async def wait_for_release(self):
+        """Wait for any background unlock started by ``release_proxies``."""
+        task = self._release_task
+        if task is not None:
+            # Shielded so a cancelled cycle cannot abort an unlock in flight
+            await asyncio.shield(task)
+            if self._release_task is task:
+                self._release_task = None
 
     async def cleanup_proxies(self):
         if self.current_proxy_ids:
-            await self.unlock_proxies(self.current_proxy_ids)
-            logging.info(f"Unlocked proxies: {self.current_proxy_ids}")
-            self.current_proxy_ids = []
-        else:
+            self.release_proxies()
+        elif self._release_task is None:
             logging.info("No proxies to unlock.")
+        await self.wait_for_release()
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Set
+from ..models.item import Item
+from ..models.comparison import Comparison
+
+BOUGHT = 'bought'
+FAILED = 'failed'
+DUPLICATE = 'duplicate'
+INSUFFICIENT_FUNDS = 'insufficient_funds'
+MISSING_LISTING = 'missing_listing'
+
+@dataclass
+class PurchaseOrder:
+    item: Item
+    comparison: Comparison
+    raw_listing: Any = None
+
+@dataclass
+class PurchaseResult:
+    order: PurchaseOrder
+    status: str
+    wallet_info: Optional[dict] = None
+    error: Optional[BaseException] = None
+
+def wallet_balance(wallet_info: Any) -> Optional[float]:
+    """Wallet balance in currency units from a buy_market_listing response (reported in cents)."""
+    try:
+        return int(wallet_info['wallet_balance']) / 100
+    except (TypeError, KeyError, ValueError):
+        return None
+
+class PurchaseExecutor:
+    """
+    Runs purchases concurrently, at most ``max_concurrency`` at a time, best
+    expected profit first. Every listing is attempted at most once across
+    calls; failed ones become eligible again after ``reset_failures``, which
+    the monitoring pass calls once per cycle. Once the wallet balance is known (from the last purchase
+    response or ``update_balance``) listings that do not fit in the balance
+    left after in-flight purchases are skipped rather than sent to Steam.
+
+    ``steam_client`` only needs an async ``buy_listing(listing)`` that returns
+    the wallet info, so tests can pass a stub.
+    """
+    def __init__(self, steam_client: Any, max_concurrency: int = 3):
+        self.steam_client = steam_client
+        self.max_concurrency = max(1, max_concurrency)
+        self.logger = logging.getLogger('purchase_executor')
+        self.balance: Optional[float] = None
+        self._reserved = 0.0
+        # Bought and in-flight listings, plus failures of the current cycle
+        self._attempted: Set[str] = set()
+        self._failed: Set[str] = set()
+        # Created lazily so it binds to the loop that uses it
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def was_attempted(self, listing_id: str) -> bool:
+        return listing_id in self._attempted
+
+    def reset_failures(self) -> None:
+        """Allow listings whose purchase failed to be attempted again."""
+        self._attempted -= self._failed
+        self._failed.clear()
+
+    def update_balance(self, wallet_info: Any) -> None:
+        balance = wallet_balance(wallet_info)
+        if balance is not None:
+            self.balance = balance
+
+    async def execute(self, orders: Iterable[PurchaseOrder]) -> List[PurchaseResult]:
+        """Attempt every order and return one result per order, best expected profit first."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        ranked = sorted(orders, key=lambda order: order.comparison.expected_profit or 0.0, reverse=True)
+        results: List[Optional[PurchaseResult]] = [None] * len(ranked)
+        tasks = []
+        for i, order in enumerate(ranked):
+            listing_id = order.comparison.item_id
+            if listing_id in self._attempted:
+                results[i] = PurchaseResult(order, DUPLICATE)
+            elif order.raw_listing is None:
+                results[i] = PurchaseResult(order, MISSING_LISTING)
+            else:
+                # Claimed before the first await, so concurrent callers cannot race for it
+                self._attempted.add(listing_id)
+                tasks.append((i, asyncio.create_task(self._buy(order))))
+
+        # Tasks queue on the semaphore in creation order, i.e. by expected profit
+        for i, task in tasks:
+            results[i] = await task
+        return results
+
+    async def _buy(self, order: PurchaseOrder) -> PurchaseResult:
+        price = order.comparison.item_price
+        async with self._semaphore:
+            if self.balance is not None and price > self.balance - self._reserved:
+                self.logger.warning(
+                    f"Skipping {order.comparison.item_id}: price {price:.2f} exceeds available "
+                    f"balance {self.balance - self._reserved:.2f}"
+                )
+                # Not attempted, so a later pass may retry once funds are available
+                self._attempted.discard(order.comparison.item_id)
+                return PurchaseResult(order, INSUFFICIENT_FUNDS)
+
+            self._reserved += price
+            try:
+                wallet_info = await self.steam_client.buy_listing(order.raw_listing)
+            except Exception as e:
+                self.logger.error(f"Failed to buy {order.comparison.item_id}: {e}")
+                self._failed.add(order.comparison.item_id)
+                return PurchaseResult(order, FAILED, error=e)
+            finally:
+                self._reserved -= price
+
+            self.update_balance(wallet_info)
+            return PurchaseResult(order, BOUGHT, wallet_info=wallet_info)
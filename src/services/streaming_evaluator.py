@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set
+from ..models.item import Item
+from .gem_valuation import GemAllocation
+from .monitoring_service import MonitoringService
+
+class StreamingEvaluator:
+    """
+    Fast path between ItemService and purchasing. Every parsed page of items is
+    priced against the current gem cache as soon as it is submitted, and
+    profitable listings are bought right away instead of after the fetch cycle
+    ends. One GemAllocation spans the whole cycle, so gem units committed to
+    earlier pages push later ones down the book. Each page is priced from the
+    ladders currently in the cache, so a gem GemService saves mid-cycle is
+    priced from its new book, with the units already committed to it carried
+    over. ``monitor_cycle`` still runs afterwards as a reconciliation pass and
+    skips listings handled here.
+    """
+    def __init__(self, monitoring_service: MonitoringService):
+        self.monitoring_service = monitoring_service
+        self.profit_engine = monitoring_service.profit_engine
+        self.gem_cache = monitoring_service.gem_cache
+        self.logger = logging.getLogger('streaming_evaluator')
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._allocation: Optional[GemAllocation] = None
+        self._purchases: Set[asyncio.Task] = set()
+
+    async def start_cycle(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.gem_cache.ensure_loaded)
+        self._allocation = GemAllocation({})
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, items: Sequence[Item], listings: Sequence[Any]) -> None:
+        """Queue a parsed page for evaluation; ``listings`` are the raw listings the items came from."""
+        if self._queue is None or not items:
+            return
+        listings_by_id = {listing.id: listing for listing in listings}
+        self._queue.put_nowait((list(items), listings_by_id))
+
+    async def finish_cycle(self) -> None:
+        """Evaluate everything submitted so far and wait for the purchases it started."""
+        if self._queue is None:
+            return
+        try:
+            await self._queue.join()
+            if self._purchases:
+                await asyncio.gather(*self._purchases, return_exceptions=True)
+        finally:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._queue = None
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            items, listings_by_id = await self._queue.get()
+            try:
+                self._evaluate(items, listings_by_id)
+            except Exception as e:
+                self.logger.error(f"Error evaluating {len(items)} streamed items: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _evaluate(self, items: List[Item], listings_by_id: Dict[str, Any]) -> None:
+        comparisons = self.profit_engine.evaluate(items, self._allocation)
+        items_by_id = {item.id: item for item in items}
+        executor = self.monitoring_service.purchase_executor
+        candidates = []
+        for comparison in self.profit_engine.rank_profitable(comparisons):
+            if executor.was_attempted(comparison.item_id):
+                continue
+            item = items_by_id[comparison.item_id]
+            self.logger.info(
+                f"Streaming purchase of {item.id} ({item.name}), expected profit {comparison.expected_profit:.2f}, "
+                f"{time.time() - item.timestamp:.3f}s after parsing"
+            )
+            candidates.append((item, comparison, listings_by_id.get(item.id)))
+        if not candidates:
+            return
+        task = asyncio.create_task(self.monitoring_service.purchase_profitable(candidates))
+        self._purchases.add(task)
+        task.add_done_callback(self._purchases.discard)
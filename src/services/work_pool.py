@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from aiosteampy import SteamPublicClient
+from ..utils.rate_limiter import RateLimiterRegistry, AdaptiveRateLimiter
+from ..utils.client_pool import ClientPool
+
+class ProxyWorker:
+    """Per-proxy resources handed to every task a pool worker runs."""
+    def __init__(self, proxy: str, client: SteamPublicClient, limiter: AdaptiveRateLimiter):
+        self.proxy = proxy
+        self.client = client
+        self.limiter = limiter
+
+class WorkLane:
+    """
+    A named queue of tasks feeding a WorkPool. Lower task priorities are served
+    first within a lane; ``weight`` scales the lane's backlog when the pool
+    decides which lane an idle worker should serve next.
+    """
+    def __init__(self, name: str, handler: Callable[[Any, "WorkLane", ProxyWorker], Awaitable[None]],
+                 weight: float = 1.0):
+        self.name = name
+        self.handler = handler
+        self.weight = weight
+        self._heap: List = []
+        self._sequence = itertools.count()
+        self._pool: Optional["WorkPool"] = None
+        # Queued plus in-flight tasks; the lane is drained once this reaches zero
+        self.outstanding = 0
+
+    def put(self, task: Any, priority: int = 0) -> None:
+        heapq.heappush(self._heap, (priority, next(self._sequence), task))
+        self.outstanding += 1
+        if self._pool is not None:
+            self._pool._changed.set()
+
+    @property
+    def queued(self) -> int:
+        return len(self._heap)
+
+    def _pop(self) -> Any:
+        return heapq.heappop(self._heap)[2]
+
+class WorkPool:
+    """
+    Runs one worker per proxy over one or more lanes. An idle worker takes the
+    next task from the lane with the largest weighted backlog, so proxies are
+    never tied to a workload that has already run dry. Tasks may put follow-up
+    or retry tasks on any lane; the pool finishes once every lane has no queued
+    or in-flight work left.
+    """
+    def __init__(self, lanes: List[WorkLane], rate_limiters: RateLimiterRegistry, clients: ClientPool):
+        self.lanes = lanes
+        self.rate_limiters = rate_limiters
+        self.clients = clients
+        self.logger = logging.getLogger('work_pool')
+        self._changed = asyncio.Event()
+        self.completed: Dict[str, int] = {lane.name: 0 for lane in lanes}
+        self._active = 0
+        for lane in lanes:
+            lane._pool = self
+
+    async def run(self, proxies: List[str]) -> None:
+        if not proxies:
+            self.logger.warning(f"No proxies for lanes {[lane.name for lane in self.lanes]}, skipping.")
+            return
+        try:
+            await asyncio.gather(*(self._worker(proxy) for proxy in proxies))
+        finally:
+            for lane in self.lanes:
+                lane._pool = None
+        self.logger.info(f"Work pool drained: {self.completed}")
+
+    def _should_retire(self, proxy: str) -> bool:
+        # A quarantined proxy stops pulling tasks, as long as another worker is left to drain the lanes
+        return self._active > 1 and self.rate_limiters.is_quarantined(proxy)
+
+    async def _next_lane(self) -> Optional[WorkLane]:
+        while True:
+            ready = [lane for lane in self.lanes if lane.queued]
+            if ready:
+                return max(ready, key=lambda lane: lane.queued * lane.weight)
+            if not any(lane.outstanding for lane in self.lanes):
+                return None
+            # In-flight tasks may still produce or requeue work
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def _worker(self, proxy: str) -> None:
+        # Sessions outlive the pool; the ClientPool closes them when the proxy rotates out
+        worker = ProxyWorker(proxy, self.clients.get(proxy), self.rate_limiters.get(proxy))
+        self._active += 1
+        try:
+            while True:
+                if self._should_retire(proxy):
+                    self.logger.warning(f"[Worker {proxy}] Proxy quarantined, leaving the pool")
+                    break
+                lane = await self._next_lane()
+                if lane is None:
+                    break
+                task = lane._pop()
+                try:
+                    await lane.handler(task, lane, worker)
+                except Exception as e:
+                    self.logger.error(f"[Worker {proxy}] Unhandled error in {lane.name} task {task}: {e}", exc_info=True)
+                finally:
+                    lane.outstanding -= 1
+                    self.completed[lane.name] += 1
+                    self._changed.set()
+        finally:
+            self._active -= 1
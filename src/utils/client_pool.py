@@ -0,0 +1,75 @@
+import logging
+from typing import Dict, Iterable
+import aiohttp
+from yarl import URL
+from aiosteampy import SteamPublicClient, Currency
+from aiosteampy.utils import patch_session_with_http_proxy
+from ..config.settings import settings
+
+try:
+    from aiohttp_socks import ProxyConnector
+except ImportError:
+    ProxyConnector = None
+
+class ClientPool:
+    """
+    Long-lived SteamPublicClient per proxy. Each client owns an aiohttp session
+    with keep-alive and DNS caching, so connections to the proxy and Steam are
+    reused across tasks and cycles instead of paying TCP and TLS handshakes
+    every time. Clients for proxies that are rotated out are evicted with
+    ``retain``.
+    """
+    def __init__(self):
+        self.logger = logging.getLogger('client_pool')
+        self.keepalive_timeout = float(getattr(settings, 'HTTP_KEEPALIVE_TIMEOUT', 60.0))
+        self.dns_cache_ttl = int(getattr(settings, 'HTTP_DNS_CACHE_TTL', 300))
+        self.connection_limit = int(getattr(settings, 'HTTP_CONNECTIONS_PER_PROXY', 10))
+        self._clients: Dict[str, SteamPublicClient] = {}
+
+    def get(self, proxy: str) -> SteamPublicClient:
+        client = self._clients.get(proxy)
+        if client is None or client.session.closed:
+            client = self._clients[proxy] = SteamPublicClient(
+                session=self._create_session(proxy),
+                currency=Currency.KZT
+            )
+            self.logger.debug(f"Opened session for proxy {proxy}")
+        return client
+
+    def _create_session(self, proxy: str) -> aiohttp.ClientSession:
+        # aiosteampy expects sessions created with raise_for_status=True
+        connector_options = dict(
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            limit=self.connection_limit,
+        )
+        if "socks" in proxy:
+            if ProxyConnector is None:
+                raise TypeError("SOCKS proxies require the aiohttp_socks package")
+            return aiohttp.ClientSession(
+                connector=ProxyConnector.from_url(proxy, **connector_options),
+                raise_for_status=True
+            )
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(**connector_options),
+            raise_for_status=True
+        )
+        return patch_session_with_http_proxy(session, URL(proxy))
+
+    async def evict(self, proxy: str) -> None:
+        client = self._clients.pop(proxy, None)
+        if client is not None:
+            await client.session.close()
+
+    async def retain(self, proxies: Iterable[str]) -> None:
+        """Close the sessions of every proxy not in ``proxies``."""
+        keep = set(proxies)
+        stale = [proxy for proxy in self._clients if proxy not in keep]
+        for proxy in stale:
+            await self.evict(proxy)
+        if stale:
+            self.logger.info(f"Evicted sessions for {len(stale)} rotated-out proxies")
+
+    async def close(self) -> None:
+        for proxy in list(self._clients):
+            await self.evict(proxy)
@@ -1,44 +1,75 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
+from ..config.settings import settings
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records as they are. The stock QueueHandler formats each record
+    on the calling thread so it can be pickled; in-process, the listener
+    thread can format it instead, and the event loop only pays for the put.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
 def setup_logging(log_queue=None):
+    global _listener
+
     # Create logs directory if it doesn't exist
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    
-    # Clear existing log file
-    log_file = log_dir / "app.log"
-    if log_file.exists():
-        log_file.unlink()
-    
-    # Force UTF-8 encoding for log file
-    file_handler = logging.FileHandler('logs/app.log', encoding='utf-8')
-    
+
+    # Size-bounded rotation instead of clearing the log on every start; force UTF-8 encoding
+    file_handler = RotatingFileHandler(
+        log_dir / "app.log",
+        maxBytes=int(getattr(settings, 'LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        backupCount=int(getattr(settings, 'LOG_BACKUP_COUNT', 5)),
+        encoding='utf-8'
+    )
+
     # Force UTF-8 encoding for console output
     if sys.platform == 'win32':
         import codecs
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, errors='replace')
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, errors='replace')
-    
+
     console_handler = logging.StreamHandler(sys.stdout)
-    
+
     handlers = [file_handler, console_handler]
-    
+
     # If a log_queue is provided, add our custom queue handler.
     if log_queue is not None:
         from src.utils.queue_log_handler import QueueLogHandler
-        queue_handler = QueueLogHandler(log_queue)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        queue_handler.setFormatter(formatter)
-        handlers.append(queue_handler)
-    
+        handlers.append(QueueLogHandler(log_queue))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Formatting, GUI serialization, rotation and file/console I/O run on the listener thread
+    previous = _listener
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
+        handlers=[_DeferredQueueHandler(records)],
+        force=True
     )
-    
+    if previous is not None:
+        _stop_listener(previous)
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+
     # Create and return loggers for the different components
     loggers = {
         'item_service': logging.getLogger('item_service'),
@@ -48,5 +79,17 @@ def setup_logging(log_queue=None):
         'parsing': logging.getLogger('parsing'),
         'database': logging.getLogger('database')
     }
-    
-    return loggers
\ No newline at end of file
+
+    return loggers
+
+def stop_logging():
+    """Write out every queued record, stop the listener thread and close its handlers."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        _stop_listener(listener)
+
+def _stop_listener(listener: QueueListener):
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,38 @@
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+# Packed buy-order ladder layout (little-endian):
+#   uint32 level count, followed by one (float64 price, int32 quantity) pair per level,
+#   best price first. Quantities are the incremental amounts from process_histogram.
+_HEADER = struct.Struct('<I')
+_LEVEL = struct.Struct('<di')
+
+# Bytes needed to read the level count and the best level only
+TOP_OF_BOOK_SIZE = _HEADER.size + _LEVEL.size
+
+def encode_buy_orders(orders: Sequence[Sequence[float]]) -> bytes:
+    """Pack ``[[price, quantity], ...]`` into the binary ladder format."""
+    buffer = bytearray(_HEADER.size + _LEVEL.size * len(orders))
+    _HEADER.pack_into(buffer, 0, len(orders))
+    offset = _HEADER.size
+    for price, quantity in orders:
+        _LEVEL.pack_into(buffer, offset, float(price), int(quantity))
+        offset += _LEVEL.size
+    return bytes(buffer)
+
+def decode_buy_orders(blob: Optional[bytes]) -> List[List[float]]:
+    """Unpack a binary ladder back into ``[[price, quantity], ...]``."""
+    if not blob:
+        return []
+    (count,) = _HEADER.unpack_from(blob, 0)
+    body = memoryview(blob)[_HEADER.size:_HEADER.size + count * _LEVEL.size]
+    return [[price, quantity] for price, quantity in _LEVEL.iter_unpack(body)]
+
+def top_of_book(blob: Optional[bytes]) -> Optional[Tuple[float, int]]:
+    """Return the best ``(price, quantity)`` without decoding the rest of the ladder."""
+    if not blob or len(blob) < TOP_OF_BOOK_SIZE:
+        return None
+    (count,) = _HEADER.unpack_from(blob, 0)
+    if count == 0:
+        return None
+    return _LEVEL.unpack_from(blob, _HEADER.size)
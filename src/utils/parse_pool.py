@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+from .parsing import ParsedListing, listing_payload, parse_listing_payloads
+
+def _init_worker():
+    # Workers cannot reach the parent's log listener; warnings and errors go to stderr
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', force=True)
+
+class ParsePool:
+    """
+    Parses pages of listings in worker processes, so gem extraction for many
+    proxies' pages does not hold up the event loop. Only the picklable
+    ``listing_payload`` tuples cross the process boundary, and records come
+    back in page order. The executor is started on first use; if a worker
+    dies, the page is parsed in-process and a fresh executor is started for
+    the next one.
+
+    Workers are spawned rather than forked: the parent runs the log
+    listener, the database writer and executor threads, and holds open
+    SQLite connections, none of which a forked child could safely inherit.
+    """
+    def __init__(self, processes: int):
+        self.processes = max(1, processes)
+        self.logger = logging.getLogger('parse_pool')
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def parse(self, listings) -> List[ParsedListing]:
+        payloads = []
+        for listing in listings:
+            try:
+                payloads.append(listing_payload(listing))
+            except Exception as e:
+                self.logger.error(f"Error processing listing {listing.id}: {str(e)}", exc_info=True)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            self.logger.info(f"Started {self.processes} parse processes")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, parse_listing_payloads, payloads)
+        except BrokenProcessPool:
+            self.logger.error("Parse process pool broke; parsing this page in-process")
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            return parse_listing_payloads(payloads)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
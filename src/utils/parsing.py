@@ -1,78 +1,141 @@
-import pandas as pd
-from bs4 import BeautifulSoup
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
 from ..config.constants import ALLOWED_GEMS_PRISMATIC, ALLOWED_GEMS_ETHEREAL, COURIERS, ITEMS
+import functools
+import html
 import logging
 import re
 import math
 
-def parse_market_listings(market_listings):
+# Distinct (item name, gem description) pairs remembered by resolve_gems
+GEM_CACHE_SIZE = 4096
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_PRISMATIC_GEM_RE = re.compile(r'(.*?)Prismatic Gem')
+_ETHEREAL_GEM_RE = re.compile(r'(.*?)Ethereal Gem')
+_ALLOWED_PRISMATIC = frozenset(ALLOWED_GEMS_PRISMATIC)
+_ALLOWED_ETHEREAL = frozenset(ALLOWED_GEMS_ETHEREAL)
+# First position of each name, so ties resolve like a scan of ALLOWED_GEMS_PRISMATIC
+_PRISMATIC_ORDER = {name: i for i, name in reversed(list(enumerate(ALLOWED_GEMS_PRISMATIC)))}
+# Zero-width lookahead reports, at every position, the earliest-listed name starting there
+_PRISMATIC_NAME_RE = re.compile(
+    '(?=(' + '|'.join(re.escape(name) for name in ALLOWED_GEMS_PRISMATIC if name) + '))'
+) if any(ALLOWED_GEMS_PRISMATIC) else None
+
+def listing_price(listing) -> float:
+    """Buyer-facing price of a listing (price plus fee), in wallet currency units."""
+    return listing.converted_price / 100 + listing.converted_fee/100
+
+def strip_tags(markup: str) -> str:
+    """Text of an HTML fragment, as BeautifulSoup(markup, 'html.parser').get_text(strip=True) returns it."""
+    chunks = (html.unescape(chunk).strip() if '&' in chunk else chunk.strip() for chunk in _TAG_RE.split(markup))
+    return ''.join(chunk for chunk in chunks if chunk)
+
+def gem_text_of(description: str) -> str:
+    """Plain gem text of a description line, without the "Empty Socket" placeholders."""
+    return strip_tags(description).replace("Empty Socket", "").strip()
+
+def match_prismatic_gem(gem_text: str):
+    """The first name of ALLOWED_GEMS_PRISMATIC that occurs anywhere in ``gem_text``, or None."""
+    if _PRISMATIC_NAME_RE is None:
+        return None
+    found = {match.group(1) for match in _PRISMATIC_NAME_RE.finditer(gem_text)}
+    return min(found, key=_PRISMATIC_ORDER.__getitem__) if found else None
+
+class ParsedListing(NamedTuple):
+    """A market listing that carries at least one gem, as produced by the parser."""
+    id: str
+    price: float
+    item_description: str
+    ethereal_gem: Optional[str] = None
+    prismatic_gem: Optional[str] = None
+
+# (listing id, market name, price, description values): the part of a listing the parser reads
+ListingPayload = Tuple[str, str, float, Tuple[str, ...]]
+
+def listing_payload(listing) -> ListingPayload:
+    """Picklable copy of what the parser needs from a listing, for parsing in another process."""
+    description = listing.item.description
+    return listing.id, description.market_name, listing_price(listing), tuple(desc.value for desc in description.descriptions)
+
+@functools.lru_cache(maxsize=GEM_CACHE_SIZE)
+def resolve_gems(item_description: str, description: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (ethereal, prismatic) gems of one gem description line of an item. The
+    same descriptions recur across thousands of listings, so results are kept
+    in an LRU cache; ``resolve_gems.cache_info()`` reports its hit rate.
+    """
+    gem_text = gem_text_of(description)
+    if item_description in COURIERS:
+        logging.getLogger('parsing').debug("Gem text: %s", gem_text)
+        return parse_gem_text_both_gems(gem_text)
+    if (("Swine of the Sunken Galley" in item_description and "Explosive Burst" in gem_text) or
+            ("Fractal Horns of Inner Abysm" in item_description and "Reflection's Shade" in gem_text)):
+        return None, None
+    return None, match_prismatic_gem(gem_text)
+
+def gem_cache_hit_rate() -> float:
+    info = resolve_gems.cache_info()
+    lookups = info.hits + info.misses
+    return info.hits / lookups if lookups else 0.0
+
+def _parse_payload(payload: ListingPayload, logger: logging.Logger) -> Optional[ParsedListing]:
+    listing_id, item_description, price, description_values = payload
+    ethereal_gem = None
+    prismatic_gem = None
+
+    if item_description in COURIERS:
+        for value in description_values:
+            if "Gem" in value:
+                ethereal_gem, prismatic_gem = resolve_gems(item_description, value)
+
+    else:
+        for value in description_values:
+            if "Gem" in value:
+                ethereal_gem, prismatic_gem = resolve_gems(item_description, value)
+                break
+
+    if not (ethereal_gem or prismatic_gem):
+        return None
+    logger.debug("Found item with gems: %s %s (%s) - E: %s, P: %s",
+                 listing_id, item_description, price, ethereal_gem, prismatic_gem)
+    return ParsedListing(listing_id, price, item_description, ethereal_gem, prismatic_gem)
+
+def iter_market_listings(market_listings) -> Iterator[ParsedListing]:
+    """Lazily parse listings, yielding a ParsedListing for every listing with gems, in input order."""
     logger = logging.getLogger('parsing')
-    logger.info(f"Starting to parse {len(market_listings)} market listings")
-    data = []
-    parsed_listing_ids = set()
+    found = 0
     
     for listing in market_listings:
         try:
-            item_description = listing.item.description.market_name
-            logger.info(f"Processing listing: {item_description}")
-            
-            listing_data = {
-                "ID": listing.id,
-                "Price": listing.converted_price / 100 + listing.converted_fee/100,
-                "Item Description": item_description,
-                "Ethereal Gem": None,
-                "Prismatic Gem": None,
-            }
-
-            if item_description in COURIERS:
-                ethereal_gem = None
-                prismatic_gem = None
-                
-                for desc in listing.item.description.descriptions:
-                    if "Gem" in desc.value:
-                        soup = BeautifulSoup(desc.value, 'html.parser')
-                        gem_text = soup.get_text(strip=True).replace("Empty Socket", "").strip()
-                        logger.info(f"Gem text: {gem_text}")
-                        logger.info(f"Price: {listing.converted_price / 100 + listing.converted_fee/100}")
-                        logger.info(f"ID: {listing.id}")
-                        logger.info(f"Item Description: {item_description}")
-
-                        print(f"Gem text: {gem_text}")
-                        print(listing.converted_price / 100 + listing.converted_fee/100)
-                        print(listing.id)
-                        print(item_description)
-                        
-                        ethereal_gem, prismatic_gem = parse_gem_text_both_gems(gem_text)
-                        print(f"Ethereal Gem: {ethereal_gem}")
-                        print(f"Prismatic Gem: {prismatic_gem}")
-                
-                listing_data["Ethereal Gem"] = ethereal_gem
-                listing_data["Prismatic Gem"] = prismatic_gem
-
-            else:
-                for desc in listing.item.description.descriptions:
-                    if "Gem" in desc.value:
-                        soup = BeautifulSoup(desc.value, 'html.parser')
-                        gem_text = soup.get_text(strip=True).replace("Empty Socket", "").strip()
-
-                        if ("Swine of the Sunken Galley" in item_description and "Explosive Burst" in gem_text) or \
-                           ("Fractal Horns of Inner Abysm" in item_description and "Reflection's Shade" in gem_text):
-                            listing_data["Prismatic Gem"] = None
-                        else:
-                            matching_gem = next((allowed for allowed in ALLOWED_GEMS_PRISMATIC if allowed in gem_text), None)
-                            if matching_gem:
-                                listing_data["Prismatic Gem"] = matching_gem
-                        break
-
-            if listing_data["Ethereal Gem"] or listing_data["Prismatic Gem"]:
-                logger.info(f"Found item with gems: {item_description} - E: {listing_data['Ethereal Gem']}, P: {listing_data['Prismatic Gem']}")
-                data.append(listing_data)
-                parsed_listing_ids.add(listing.id)
+            record = _parse_payload(listing_payload(listing), logger)
         except Exception as e:
             logger.error(f"Error processing listing {listing.id}: {str(e)}", exc_info=True)
+            continue
+        if record is not None:
+            found += 1
+            yield record
     
-    logger.info(f"Finished parsing. Found {len(data)} items with gems")
-    return pd.DataFrame(data), parsed_listing_ids
+    logger.debug("Parsed %d market listings, %d with gems", len(market_listings), found)
+
+def parse_listing_payloads(payloads: List[ListingPayload]) -> List[ParsedListing]:
+    """Parse listing_payload tuples, in order; this is what ParsePool runs in its worker processes."""
+    logger = logging.getLogger('parsing')
+    records = []
+    for payload in payloads:
+        try:
+            record = _parse_payload(payload, logger)
+        except Exception as e:
+            logger.error(f"Error processing listing {payload[0]}: {str(e)}", exc_info=True)
+            continue
+        if record is not None:
+            records.append(record)
+    logger.debug("Parsed %d market listings, %d with gems", len(payloads), len(records))
+    return records
+
+def parse_market_listings(market_listings) -> Tuple[List[ParsedListing], Set[str]]:
+    """Parse a page of listings eagerly; returns the records and the IDs of the listings they came from."""
+    records = list(iter_market_listings(market_listings))
+    return records, {record.id for record in records}
 
 
 def parse_gem_text_both_gems(gem_text):
@@ -80,13 +143,13 @@ def parse_gem_text_both_gems(gem_text):
     prismatic_gem = None
 
     # Determine which gem type appears first using regex
-    prismatic_match = re.search(r'(.*?)Prismatic Gem', gem_text)
-    ethereal_match = re.search(r'(.*?)Ethereal Gem', gem_text)
+    prismatic_match = _PRISMATIC_GEM_RE.search(gem_text)
+    ethereal_match = _ETHEREAL_GEM_RE.search(gem_text)
 
     if prismatic_match and (not ethereal_match or prismatic_match.start() < ethereal_match.start()):
         # Process Prismatic Gem first
         prismatic_name = prismatic_match.group(1).strip()
-        if prismatic_name in ALLOWED_GEMS_PRISMATIC:
+        if prismatic_name in _ALLOWED_PRISMATIC:
             prismatic_gem = prismatic_name
         # Remove processed gem from text
         gem_text = gem_text[prismatic_match.end():].strip()
@@ -94,30 +157,24 @@ def parse_gem_text_both_gems(gem_text):
     elif ethereal_match:
         # Process Ethereal Gem first
         ethereal_name = ethereal_match.group(1).strip()
-        if ethereal_name in ALLOWED_GEMS_ETHEREAL:
+        if ethereal_name in _ALLOWED_ETHEREAL:
             ethereal_gem = ethereal_name
         # Remove processed gem from text
         gem_text = gem_text[ethereal_match.end():].strip()
 
     # Process the remaining gem type
-    prismatic_match = re.search(r'(.*?)Prismatic Gem', gem_text)
+    prismatic_match = _PRISMATIC_GEM_RE.search(gem_text)
     if prismatic_match:
         prismatic_name = prismatic_match.group(1).strip()
-        if prismatic_name in ALLOWED_GEMS_PRISMATIC:
+        if prismatic_name in _ALLOWED_PRISMATIC:
             prismatic_gem = prismatic_name
 
-    ethereal_match = re.search(r'(.*?)Ethereal Gem', gem_text)
+    ethereal_match = _ETHEREAL_GEM_RE.search(gem_text)
     if ethereal_match:
         ethereal_name = ethereal_match.group(1).strip()
-        if ethereal_name in ALLOWED_GEMS_ETHEREAL:
+        if ethereal_name in _ALLOWED_ETHEREAL:
             ethereal_gem = ethereal_name
 
-    # Debugging output
-    print(f"Processed Gem Text: {gem_text}")
-    print(f"Matched Ethereal Gem: {ethereal_gem}")
-    print(f"Matched Prismatic Gem: {prismatic_gem}")
-    print("-" * 50)
-
     return ethereal_gem, prismatic_gem
 
 
@@ -178,7 +235,7 @@ def process_histogram(histogram):
     # Check if 'buy_order_graph' exists
     if not hasattr(histogram, 'buy_order_graph'):
         logger.warning("Histogram missing buy_order_graph attribute")
-        logger.debug(f"Raw histogram data: {histogram}")
+        logger.debug("Raw histogram data: %s", histogram)
         return {
             "buy_orders": [],
             "buy_order_length": 0,
@@ -186,7 +243,7 @@ def process_histogram(histogram):
 
     try:
         buy_orders = []
-        logger.debug(f"Processing buy_order_graph: {histogram.buy_order_graph}")
+        logger.debug("Processing buy_order_graph: %s", histogram.buy_order_graph)
 
         # Process each buy order entry
         for entry in histogram.buy_order_graph:
@@ -19,6 +19,8 @@ class QueueLogHandler(logging.Handler):
             # If extra structured data exists, include it.
             if hasattr(record, "worker_info"):
                 log_entry.update(record.worker_info)
+            if hasattr(record, "summary"):
+                log_entry["summary"] = record.summary
             self.log_queue.put(json.dumps(log_entry))
         except Exception:
             self.handleError(record) 
\ No newline at end of file
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+import aiohttp
+from aiosteampy.exceptions import RateLimitExceeded
+from ..config.settings import settings
+
+def is_throttle_error(error: BaseException) -> bool:
+    """True for errors that mean the proxy is being rate limited (429s and timeouts)."""
+    if isinstance(error, (RateLimitExceeded, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, aiohttp.ClientResponseError) and error.status == 429:
+        return True
+    cause = error.__cause__
+    return cause is not None and cause is not error and is_throttle_error(cause)
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket for a single proxy whose refill rate adapts AIMD-style:
+    every successful request raises the rate by a fixed step, every 429 or
+    timeout multiplies it down and empties the bucket.
+    """
+    def __init__(self, proxy: str, health=None):
+        self.proxy = proxy
+        # Optional observer notified of every request outcome (see ProxyService)
+        self.health = health
+        self.logger = logging.getLogger('rate_limiter')
+        self.min_rate = float(getattr(settings, 'RATE_LIMIT_MIN', 0.05))
+        self.max_rate = float(getattr(settings, 'RATE_LIMIT_MAX', 5.0))
+        self.rate = float(getattr(settings, 'RATE_LIMIT_INITIAL', 1.0))
+        self.increase = float(getattr(settings, 'RATE_LIMIT_INCREASE', 0.05))
+        self.decrease = float(getattr(settings, 'RATE_LIMIT_DECREASE', 0.5))
+        self.burst = float(getattr(settings, 'RATE_LIMIT_BURST', 1.0))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        # Created lazily so the lock binds to the loop that uses it
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """Wait until the bucket holds a token, then take it."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self) -> None:
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._tokens = 0.0
+        self.logger.warning(f"[Worker {self.proxy}] Throttled, backing off to {self.rate:.2f} req/s")
+
+    @asynccontextmanager
+    async def request(self):
+        """Acquire a token for one request and feed its outcome back into the rate."""
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if throttled:
+                self.on_throttle()
+            if self.health is not None:
+                self.health.record_failure(self.proxy, throttled)
+            raise
+        else:
+            self.on_success()
+            if self.health is not None:
+                self.health.record_success(self.proxy, time.monotonic() - started)
+
+class RateLimiterRegistry:
+    """
+    Shared per-proxy limiters, kept across cycles so learned rates carry over.
+    ``health`` (usually the ProxyService) receives every request outcome and
+    decides which proxies are quarantined.
+    """
+    def __init__(self, health=None):
+        self.health = health
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+    def get(self, proxy: str) -> AdaptiveRateLimiter:
+        limiter = self._limiters.get(proxy)
+        if limiter is None:
+            limiter = self._limiters[proxy] = AdaptiveRateLimiter(proxy, self.health)
+        return limiter
+
+    def is_quarantined(self, proxy: str) -> bool:
+        return self.health is not None and self.health.is_quarantined(proxy)
@@ -7,6 +7,7 @@ from aiosteampy import SteamClient, Currency, App, AppContext
 from aiosteampy.helpers import restore_from_cookies
 from aiosteampy.utils import get_jsonable_cookies
 from aiosteampy.models import MarketListing
+from aiosteampy.exceptions import SessionExpired
 import aiohttp
 from ..config.settings import settings
 
@@ -20,6 +21,11 @@ class SteamMarketClient:
         self.config_path = Path(config_path)
         self.cookies_path = Path(cookies_path)
         self.client: Optional[SteamClient] = None
+        self.keep_alive_interval = float(getattr(settings, 'STEAM_KEEPALIVE_INTERVAL', 300))
+        self._ready = False
+        # Created lazily so they bind to the loop that uses them
+        self._lock: Optional[asyncio.Lock] = None
+        self._keep_alive_task: Optional[asyncio.Task] = None
         
         # Configure logging
         logging.basicConfig(level=logging_level)
@@ -29,32 +35,34 @@ class SteamMarketClient:
     def get_random_user_agent() -> str:
         return "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36"
 
-    async def save_session_cookies(self) -> None:
-        if not self.client:
+    async def save_session_cookies(self, client: Optional[SteamClient] = None) -> None:
+        client = client or self.client
+        if not client:
             raise ValueError("Client not initialized")
         
-        cookies = get_jsonable_cookies(self.client.session)
+        cookies = get_jsonable_cookies(client.session)
         with open(self.cookies_path, "w") as f:
             json.dump(cookies, f)
         self.logger.info("Session cookies saved.")
 
-    async def load_session_and_login(self) -> None:
-        if not self.client:
+    async def load_session_and_login(self, client: Optional[SteamClient] = None) -> None:
+        client = client or self.client
+        if not client:
             raise ValueError("Client not initialized")
 
         try:
             with open(self.cookies_path, "r") as f:
                 cookies = json.load(f)
-            await restore_from_cookies(cookies, self.client)
-            if not await self.client.is_session_alive():
+            await restore_from_cookies(cookies, client)
+            if not await client.is_session_alive():
                 self.logger.info("Session not alive. Logging in...")
-                await self.client.login()
+                await client.login()
             else:
                 self.logger.info("Session restored successfully.")
         except FileNotFoundError:
             self.logger.info("No cookies file found. Logging in...")
-            await self.client.login()
-            await self.save_session_cookies()
+            await client.login()
+            await self.save_session_cookies(client)
 
     def load_config(self) -> dict:
         try:
@@ -70,7 +78,7 @@ class SteamMarketClient:
     async def initialize(self) -> None:
         config = self.load_config()
         
-        self.client = SteamClient(
+        client = SteamClient(
             steam_id=config["steam_id"],
             username=config["username"],
             password=config["password"],
@@ -79,8 +87,58 @@ class SteamMarketClient:
             wallet_currency=Currency[config["wallet_currency"]],
             user_agent=self.get_random_user_agent(),
         )
-        
-        await self.load_session_and_login()
+        try:
+            await self.load_session_and_login(client)
+        except BaseException:
+            # A failed login must not leave its session behind; the next attempt builds a fresh one
+            await client.session.close()
+            raise
+
+        # Replace the previous client only once the new one is logged in
+        previous, self.client = self.client, client
+        if previous is not None:
+            await previous.session.close()
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def ensure_ready(self) -> SteamClient:
+        """Initialize and log in on first use; once warm this returns immediately."""
+        if not self._ready:
+            async with self._get_lock():
+                if not self._ready:
+                    await self.initialize()
+                    self._ready = True
+        return self.client
+
+    async def refresh_session(self) -> None:
+        """Log in again if Steam no longer considers the session alive."""
+        await self.ensure_ready()
+        async with self._get_lock():
+            if not await self.client.is_session_alive():
+                self.logger.info("Session expired. Logging in again...")
+                await self.client.login()
+                await self.save_session_cookies()
+
+    def start_keep_alive(self) -> None:
+        """
+        Warm the client up in the background and re-check the session every
+        ``STEAM_KEEPALIVE_INTERVAL`` seconds, so a purchase is a single request.
+        """
+        if self._keep_alive_task is None or self._keep_alive_task.done():
+            self._keep_alive_task = asyncio.create_task(self._keep_alive())
+
+    async def _keep_alive(self) -> None:
+        while True:
+            try:
+                await self.refresh_session()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Session keep-alive failed: {e}")
+            await asyncio.sleep(self.keep_alive_interval)
 
     async def buy_listing(self, listing: Any) -> dict:
         """
@@ -108,6 +166,13 @@ class SteamMarketClient:
                 wallet_info = await self.client.buy_market_listing(listing)
                 self.logger.info(f"Successfully bought the listing: {wallet_info}")
                 return wallet_info
+
+            except SessionExpired:
+                if attempt < max_retries - 1:
+                    self.logger.warning("Session expired while buying, refreshing and retrying...")
+                    await self.refresh_session()
+                    continue
+                raise
                 
             except aiohttp.ClientResponseError as e:
                 # Handle specific HTTP errors
@@ -140,8 +205,17 @@ class SteamMarketClient:
         raise Exception(f"Failed to buy listing after {max_retries} attempts")
 
     async def close(self) -> None:
-        """Close the client session."""
+        """Stop the keep-alive task and close the client session."""
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+            try:
+                await self._keep_alive_task
+            except asyncio.CancelledError:
+                pass
+            self._keep_alive_task = None
         if self.client:
             await self.save_session_cookies()
             await self.client.session.close()
-            self.logger.info("Session closed.") 
\ No newline at end of file
+            self.client = None
+            self._ready = False
+            self.logger.info("Session closed.")
\ No newline at end of file
@@ -1,29 +1,54 @@
 import logging
 from typing import Optional
 
+class _WorkerMessage:
+    """Message of a WorkerLogger record; the prefix and %-args are applied only when a handler formats it."""
+    __slots__ = ('proxy', 'item_name', 'message', 'args')
+
+    def __init__(self, proxy: str, item_name: Optional[str], message: str, args: tuple):
+        self.proxy = proxy
+        self.item_name = item_name
+        self.message = message
+        self.args = args
+
+    def __str__(self) -> str:
+        message = self.message % self.args if self.args else self.message
+        if self.item_name:
+            return f"[Worker {self.proxy}] [{self.item_name}] {message}"
+        return f"[Worker {self.proxy}] {message}"
+
 class WorkerLogger:
+    """
+    Logger for one worker, prefixing messages with its proxy and current item.
+    Messages take %-style args like ``logging``; nothing is built for levels
+    that are disabled, and the message text is rendered only by handlers that
+    accept the record. Keyword ``fields`` attach a structured ``summary`` dict
+    to the record.
+    """
     def __init__(self, service_name: str, proxy: str, item_name: Optional[str] = None):
         self.logger = logging.getLogger(service_name)
         self.proxy = proxy
         self.item_name = item_name
-        
-    def _format_message(self, message: str) -> str:
-        prefix = f"[Worker {self.proxy}]"
-        if self.item_name:
-            prefix += f" [{self.item_name}]"
-        return f"{prefix} {message}"
-        
-    def info(self, message: str):
-        self.logger.info(self._format_message(message), extra={"worker_info": {"proxy": self.proxy, "item": self.item_name}})
-        
-    def error(self, message: str, exc_info=None):
-        self.logger.error(self._format_message(message), exc_info=exc_info, extra={"worker_info": {"proxy": self.proxy, "item": self.item_name}})
-        
-    def debug(self, message: str):
-        self.logger.debug(self._format_message(message), extra={"worker_info": {"proxy": self.proxy, "item": self.item_name}})
-        
+
+    def _log(self, level: int, message: str, args: tuple, exc_info=None, fields: Optional[dict] = None):
+        if not self.logger.isEnabledFor(level):
+            return
+        extra = {"worker_info": {"proxy": self.proxy, "item": self.item_name}}
+        if fields:
+            extra["summary"] = fields
+        self.logger.log(level, _WorkerMessage(self.proxy, self.item_name, message, args), exc_info=exc_info, extra=extra)
+
+    def info(self, message: str, *args, fields: Optional[dict] = None):
+        self._log(logging.INFO, message, args, fields=fields)
+
+    def error(self, message: str, *args, exc_info=None):
+        self._log(logging.ERROR, message, args, exc_info=exc_info)
+
+    def debug(self, message: str, *args, fields: Optional[dict] = None):
+        self._log(logging.DEBUG, message, args, fields=fields)
+
     def set_item(self, item_name: str):
         self.item_name = item_name
 
-    def warning(self, message: str):
-        self.logger.warning(self._format_message(message), extra={"worker_info": {"proxy": self.proxy, "item": self.item_name}})
\ No newline at end of file
+    def warning(self, message: str, *args):
+        self._log(logging.WARNING, message, args)
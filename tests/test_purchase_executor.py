@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.item import Item
+from src.models.comparison import Comparison
+from src.services.purchase_executor import (
+    PurchaseExecutor, PurchaseOrder, BOUGHT, FAILED, DUPLICATE, INSUFFICIENT_FUNDS, MISSING_LISTING
+)
+
+class StubSteamClient:
+    """Stands in for SteamMarketClient: records purchases and reports a shrinking wallet."""
+    def __init__(self, balance: float, delay: float = 0.01, failing=()):
+        self.balance = balance
+        self.delay = delay
+        self.failing = set(failing)
+        self.bought = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def buy_listing(self, listing):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if listing['id'] in self.failing:
+                raise RuntimeError("listing already sold")
+            self.balance -= listing['price']
+            self.bought.append(listing['id'])
+            return {'wallet_balance': str(round(self.balance * 100)), 'success': 1}
+        finally:
+            self.in_flight -= 1
+
+def make_order(listing_id: str, price: float, profit: float, with_listing: bool = True) -> PurchaseOrder:
+    item = Item(listing_id, 'Some Arcana', price, None, 'Purple', 0.0)
+    comparison = Comparison(listing_id, price, True, 0.0, expected_profit=profit)
+    raw_listing = {'id': listing_id, 'price': price} if with_listing else None
+    return PurchaseOrder(item, comparison, raw_listing)
+
+def test_buys_best_profit_first_within_concurrency_bound():
+    client = StubSteamClient(balance=1000)
+    executor = PurchaseExecutor(client, max_concurrency=2)
+    orders = [make_order(f'l{i}', 10, profit) for i, profit in enumerate([5, 40, 20, 30, 10])]
+
+    results = asyncio.run(executor.execute(orders))
+
+    assert [result.order.comparison.expected_profit for result in results] == [40, 30, 20, 10, 5]
+    assert all(result.status == BOUGHT for result in results)
+    assert client.max_in_flight == 2
+    # Started in profit order; the first two run side by side
+    assert set(client.bought[:2]) == {'l1', 'l3'}
+    assert client.bought[2:] == ['l2', 'l4', 'l0']
+
+def test_listing_is_attempted_only_once():
+    client = StubSteamClient(balance=1000, failing={'l1'})
+    executor = PurchaseExecutor(client)
+
+    async def run():
+        first = await executor.execute([make_order('l0', 10, 20), make_order('l1', 10, 15)])
+        second = await executor.execute([make_order('l0', 10, 20), make_order('l1', 10, 15), make_order('l2', 10, 12)])
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert [result.status for result in first] == [BOUGHT, FAILED]
+    assert [result.status for result in second] == [DUPLICATE, DUPLICATE, BOUGHT]
+    assert client.bought == ['l0', 'l2']
+
+def test_failed_listings_are_retried_after_reset():
+    client = StubSteamClient(balance=1000, failing={'l1'})
+    executor = PurchaseExecutor(client)
+
+    async def run():
+        await executor.execute([make_order('l0', 10, 20), make_order('l1', 10, 15)])
+        executor.reset_failures()
+        client.failing.clear()
+        return await executor.execute([make_order('l0', 10, 20), make_order('l1', 10, 15)])
+
+    results = asyncio.run(run())
+
+    # Bought listings stay claimed; the failed one gets another attempt
+    assert [result.status for result in results] == [DUPLICATE, BOUGHT]
+    assert client.bought == ['l0', 'l1']
+
+def test_skips_listings_the_wallet_cannot_cover():
+    client = StubSteamClient(balance=100)
+    executor = PurchaseExecutor(client, max_concurrency=1)
+    orders = [make_order('l0', 60, 30), make_order('l1', 50, 20), make_order('l2', 30, 10)]
+
+    results = asyncio.run(executor.execute(orders))
+
+    # The first purchase reports 40 left: 50 is unaffordable, 30 still fits
+    assert [result.status for result in results] == [BOUGHT, INSUFFICIENT_FUNDS, BOUGHT]
+    assert executor.balance == 10
+    assert not executor.was_attempted('l1')
+
+def test_in_flight_purchases_are_reserved_against_the_balance():
+    client = StubSteamClient(balance=100)
+    executor = PurchaseExecutor(client, max_concurrency=3)
+    executor.update_balance({'wallet_balance': '10000'})
+
+    results = asyncio.run(executor.execute([make_order('l0', 70, 30), make_order('l1', 70, 20)]))
+
+    assert [result.status for result in results] == [BOUGHT, INSUFFICIENT_FUNDS]
+    assert client.bought == ['l0']
+
+def test_missing_raw_listing_is_not_sent():
+    client = StubSteamClient(balance=100)
+    executor = PurchaseExecutor(client)
+
+    results = asyncio.run(executor.execute([make_order('l0', 10, 30, with_listing=False)]))
+
+    assert results[0].status == MISSING_LISTING
+    assert client.bought == []